@@ -0,0 +1,48 @@
+"""Measure the time to parse a large config.
+
+Run with `python -m benchmarks.config_parser_benchmark`.
+"""
+
+import os
+import tempfile
+import timeit
+
+import click
+
+from mirror.config_parser import Parser
+from mirror.constants import MIRROR_FILE
+from mirror.typed_path import AbsDir
+
+
+def write_config(directory: AbsDir, *, num_repos: int, num_files: int) -> None:
+    lines = ["repos:"]
+    for repo in range(num_repos):
+        lines.append(f"  - source: https://github.com/example/repo{repo}")
+        lines.append("    files:")
+        for file in range(repo, num_files, num_repos):
+            if file % 2:
+                lines.append(f"      - folder{file % 100}/file{file}.py")
+            else:
+                lines.append(f"      - target/file{file}.py: folder{file % 100}/file{file}.py")
+    with open(directory / MIRROR_FILE, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+@click.command()
+@click.option("--num-files", type=click.IntRange(min=1), default=10_000)
+@click.option("--num-repos", type=click.IntRange(min=1), default=10)
+@click.option("--repeats", type=click.IntRange(min=1), default=5)
+def main(num_files: int, num_repos: int, repeats: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = AbsDir(os.path.abspath(tmp))
+        write_config(directory, num_repos=num_repos, num_files=num_files)
+        seconds = min(
+            timeit.repeat(
+                lambda: Parser.parse_file(directory / MIRROR_FILE), number=1, repeat=repeats
+            )
+        )
+    click.echo(f"Parsed {num_files} files from {num_repos} repos in {seconds * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
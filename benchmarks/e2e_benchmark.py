@@ -0,0 +1,256 @@
+"""Measure `install`, `sync` and `check` end-to-end on generated repos, with a breakdown by phase.
+
+Each source repo has `--num-files` files and `--num-commits` commits. The working repo is
+installed from the first commit of each source, then synced to the last, then checked.
+
+Run with `python -m benchmarks.e2e_benchmark`.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+import contextlib
+from dataclasses import dataclass, field
+import functools
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+from unittest import mock
+
+import click
+from loguru import logger
+
+from mirror.checker import MirrorChecker
+from mirror.constants import MIRROR_FILE
+from mirror.diff import Diff
+from mirror.githelper import GitHelper
+from mirror.installer import MirrorInstaller
+from mirror.lock import FileSystemLock
+from mirror.manager import ExistingMirrorManager
+from mirror.mirror import Mirror
+from mirror.repo import MirrorRepo
+from mirror.syncer import MirrorSyncer
+from mirror.typed_path import AbsDir, GitDir, RelDir
+
+# Phases may be nested (eg `verify` runs during `checkout`) or run in parallel threads (eg `diff`),
+# so need not add up to the total.
+PHASES: dict[str, tuple[type, str]] = {
+    "checkout": (Mirror, "checkout_all"),
+    "verify": (MirrorRepo, "verify_all_files_exist"),
+    "diff": (MirrorRepo, "diffs"),
+    "apply": (Diff, "apply_all"),
+    "lock": (FileSystemLock, "unlock"),
+    "load_lock": (ExistingMirrorManager, "load_state"),
+}
+
+
+@dataclass(frozen=True)
+class RepoShape:
+    num_repos: int
+    num_files: int
+    num_commits: int
+    file_size: int
+    index_size: int
+
+    def file_sizes(self) -> list[int]:
+        # Cycle through small, medium and large files.
+        return [
+            max(1, self.file_size * scale // 4)
+            for scale in (1, 4, 16)
+            for _ in range(-(-self.num_files // 3))
+        ][: self.num_files]
+
+
+def contents(repo: int, file: int, commit: int, size: int) -> bytes:
+    """Return text where about a tenth of the lines change in each commit."""
+    lines = []
+    length = 0
+    line = 0
+    while length < size:
+        version = commit if (line + file) % 10 == commit % 10 else 0
+        lines.append(f"repo {repo} file {file} line {line} version {version}\n")
+        length += len(lines[-1])
+        line += 1
+    return "".join(lines).encode()[:size]
+
+
+def source_path(file: int) -> str:
+    return f"folder{file % 10}/file{file}.txt"
+
+
+def fast_import(local: AbsDir, commits: Iterator[list[tuple[str, bytes]]]) -> list[str]:
+    """Write one commit per list of (path, contents) on `main`, returning their hashes."""
+    stream = []
+    marks = []
+    for mark, files in enumerate(commits, 1):
+        message = f"Commit {mark}".encode()
+        stream.append(b"commit refs/heads/main\nmark :%d\n" % mark)
+        stream.append(b"committer Benchmark <benchmark@example.com> %d +0000\n" % mark)
+        stream.append(b"data %d\n%b\n" % (len(message), message))
+        for path, data in files:
+            stream.append(b"M 100644 inline %b\ndata %d\n%b\n" % (path.encode(), len(data), data))
+        marks.append(mark)
+    marks_file = local / RelDir(".git/benchmark-marks")
+    subprocess.run(
+        ["git", "fast-import", "--quiet", f"--export-marks={os.fspath(marks_file)}"],
+        cwd=local,
+        input=b"".join(stream),
+        check=True,
+    )
+    with open(marks_file) as f:
+        hashes = dict(line.split() for line in f)
+    return [hashes[f":{mark}"] for mark in marks]
+
+
+def make_source_repo(local: AbsDir, repo: int, shape: RepoShape) -> list[str]:
+    subprocess.run(["git", "init", "-q", "-b", "main", local], check=True)
+    sizes = shape.file_sizes()
+
+    def commits() -> Iterator[list[tuple[str, bytes]]]:
+        for commit in range(shape.num_commits):
+            yield [
+                (source_path(file), contents(repo, file, commit, size))
+                for file, size in enumerate(sizes)
+                # Every file is added in the first commit, then a tenth change in each commit.
+                if commit == 0 or file % 10 == commit % 10
+            ]
+
+    return fast_import(local, commits())
+
+
+def make_target_repo(local: AbsDir, sources: list[AbsDir], shape: RepoShape) -> None:
+    subprocess.run(["git", "init", "-q", "-b", "main", local], check=True)
+    config = ["repos:"]
+    for repo, source in enumerate(sources):
+        config.append(f"  - source: file://{os.fspath(source)}")
+        config.append("    files:")
+        config.extend(
+            f"      - repo{repo}/{source_path(file)}: {source_path(file)}"
+            for file in range(shape.num_files)
+        )
+    files = [(os.fspath(MIRROR_FILE), "\n".join(config).encode() + b"\n")]
+    files.extend(
+        (f"src/dir{file // 100}/file{file}.txt", b"file %d\n" % file)
+        for file in range(shape.index_size)
+    )
+    fast_import(local, iter([files]))
+    subprocess.run(["git", "reset", "-q", "--hard"], cwd=local, check=True)
+
+
+def set_sources(sources: list[AbsDir], commits: list[list[str]], index: int) -> None:
+    for source, source_commits in zip(sources, commits, strict=True):
+        subprocess.run(
+            ["git", "update-ref", "refs/heads/main", source_commits[index]], cwd=source, check=True
+        )
+
+
+@dataclass
+class PhaseTimer:
+    seconds: defaultdict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    @contextlib.contextmanager
+    def timing(self) -> Iterator[None]:
+        with contextlib.ExitStack() as stack:
+            for phase, (owner, name) in PHASES.items():
+                timed = self._timed(phase, getattr(owner, name))
+                if isinstance(inspect.getattr_static(owner, name), classmethod):
+                    timed = staticmethod(timed)
+                stack.enter_context(mock.patch.object(owner, name, timed))
+            yield
+
+    def _timed(self, phase: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds[phase] += time.perf_counter() - start
+
+        return timed
+
+
+def run_command(command: Callable[[], object]) -> dict[str, Any]:
+    # Checkouts are cached per command, as in the CLI.
+    GitHelper.checkout.cache_clear()
+    timer = PhaseTimer()
+    start = time.perf_counter()
+    with timer.timing():
+        command()
+    seconds = time.perf_counter() - start
+    return dict(seconds=seconds, phases=dict(timer.seconds))
+
+
+@contextlib.contextmanager
+def isolated_cache(cache: AbsDir) -> Iterator[None]:
+    """Start with an empty cache, rather than the user's."""
+    GitHelper._object_store.cache_clear()
+    with (
+        mock.patch("mirror.cache.MIRROR_CACHE", cache),
+        mock.patch("mirror.githelper.MIRROR_CACHE", cache),
+        mock.patch("mirror.patch_cache.MIRROR_CACHE", cache),
+        mock.patch("mirror.repo.MIRROR_CACHE", cache),
+    ):
+        yield
+    GitHelper._object_store.cache_clear()
+
+
+def run_benchmark(directory: AbsDir, shape: RepoShape) -> dict[str, Any]:
+    start = time.perf_counter()
+    sources = [directory / RelDir(f"source{repo}") for repo in range(shape.num_repos)]
+    commits = [make_source_repo(source, repo, shape) for repo, source in enumerate(sources)]
+    target = directory / RelDir("target")
+    make_target_repo(target, sources, shape)
+    generate_seconds = time.perf_counter() - start
+
+    results: dict[str, Any] = dict(generate=dict(seconds=generate_seconds))
+    with isolated_cache(directory / RelDir("cache")):
+        set_sources(sources, commits, 0)
+        installer = MirrorInstaller(target=GitDir(target), source=target / MIRROR_FILE)
+        results["install"] = run_command(installer.install)
+        set_sources(sources, commits, -1)
+        results["sync"] = run_command(MirrorSyncer(target=GitDir(target)).sync)
+        results["check"] = run_command(MirrorChecker(target=GitDir(target)).check)
+    return results
+
+
+@click.command()
+@click.option("--num-repos", type=click.IntRange(min=1), default=4)
+@click.option("--num-files", type=click.IntRange(min=1), default=50)
+@click.option("--num-commits", type=click.IntRange(min=2), default=10)
+@click.option("--file-size", type=click.IntRange(min=1), default=4096)
+@click.option("--index-size", type=click.IntRange(min=0), default=1000)
+@click.option("--output", type=click.Path(dir_okay=False), default="e2e_benchmark.json")
+def main(
+    num_repos: int, num_files: int, num_commits: int, file_size: int, index_size: int, output: str
+) -> None:
+    shape = RepoShape(num_repos, num_files, num_commits, file_size, index_size)
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run_benchmark(AbsDir(os.path.abspath(tmp)), shape)
+    report = dict(
+        shape=shape.__dict__,
+        python=platform.python_version(),
+        git=".".join(map(str, GitHelper.version())),
+        results=results,
+    )
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    for command in ("install", "sync", "check"):
+        phases = ", ".join(
+            f"{phase} {seconds * 1e3:.1f}ms"
+            for phase, seconds in results[command]["phases"].items()
+        )
+        click.echo(f"{command:>7}: {results[command]['seconds'] * 1e3:.1f}ms ({phases})")
+    click.echo(f"Wrote results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Measure the cost of a `describe` span with and without the level enabled.
+
+Run with `python -m benchmarks.logger_benchmark`.
+"""
+
+from collections.abc import Callable
+import timeit
+
+import click
+from loguru import logger
+
+from mirror.logger import describe
+
+
+def span(stack_depth: int) -> None:
+    if stack_depth > 0:
+        span(stack_depth - 1)
+    else:
+        with describe("Benchmarking"):
+            ...
+
+
+def time_per_span(fn: Callable[[], None], repeats: int) -> float:
+    return min(timeit.repeat(fn, number=repeats, repeat=5)) / repeats
+
+
+@click.command()
+@click.option("--repeats", type=click.IntRange(min=1), default=10_000)
+@click.option("--stack-depth", type=click.IntRange(min=0), default=20)
+def main(repeats: int, stack_depth: int) -> None:
+    for level in ["INFO", "TRACE"]:
+        logger.remove()
+        logger.add(lambda _: None, level=level)
+        seconds = time_per_span(lambda: span(stack_depth), repeats)
+        click.echo(f"{level:>5} sink: {seconds * 1e6:.2f}us per span")
+
+
+if __name__ == "__main__":
+    main()
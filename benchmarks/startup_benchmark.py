@@ -0,0 +1,60 @@
+"""Measure the time to start the CLI, and which imports it spends that time on.
+
+Run with `python -m benchmarks.startup_benchmark`.
+"""
+
+import re
+import subprocess
+import sys
+import time
+
+import click
+
+IMPORT_TIME_PATTERN = re.compile(r"import time:\s*(\d+) \|\s*(\d+) \|\s*(\S+)")
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Return the self and cumulative import time (in microseconds) of each module loaded."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if (match := IMPORT_TIME_PATTERN.match(line)) is not None:
+            self_time, cumulative_time, name = match.groups()
+            times[name] = (int(self_time), int(cumulative_time))
+    return times
+
+
+def time_command(args: list[str], repeats: int) -> float:
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, capture_output=True)
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+@click.command()
+@click.option("--repeats", type=click.IntRange(min=1), default=10)
+@click.option("--top", type=click.IntRange(min=0), default=10)
+def main(repeats: int, top: int) -> None:
+    times = import_times("mirror.main")
+    click.echo(f"Imported mirror.main in {times['mirror.main'][1] / 1e3:.1f}ms")
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    for name, (self_time, _) in slowest:
+        click.echo(f"{self_time / 1e3:>8.1f}ms {name}")
+    deferred = [name for name in ("git", "yaml", "mirror.githelper") if name in times]
+    if deferred:
+        click.echo(f"Imported on startup: {', '.join(deferred)}")
+    seconds = time_command(
+        [sys.executable, "-c", "from mirror import main_cli; main_cli()", "--help"], repeats
+    )
+    click.echo(f"Ran `mirror --help` in {seconds * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Measure the time to dump and load a large lock file.
+
+Run with `python -m benchmarks.state_benchmark`.
+"""
+
+import io
+import timeit
+
+import click
+
+from mirror.state import MirrorRepoState, MirrorState
+from mirror.typed_path import RelFile, Remote
+from mirror.types import Commit
+
+
+def make_state(num_repos: int, files_per_repo: int) -> MirrorState:
+    return MirrorState(
+        [
+            MirrorRepoState(
+                Remote(f"https://github.com/example/repo{repo}"),
+                Commit(f"{repo:040x}"),
+                [RelFile(f"folder/file{file}.py") for file in range(files_per_repo)],
+            )
+            for repo in range(num_repos)
+        ]
+    )
+
+
+@click.command()
+@click.option("--num-repos", type=click.IntRange(min=1), default=1_000)
+@click.option("--files-per-repo", type=click.IntRange(min=1), default=5)
+@click.option("--repeats", type=click.IntRange(min=1), default=5)
+def main(num_repos: int, files_per_repo: int, repeats: int) -> None:
+    state = make_state(num_repos, files_per_repo)
+    contents = io.StringIO()
+    state.dump(contents)
+
+    dump_seconds = min(timeit.repeat(lambda: state.dump(io.StringIO()), number=1, repeat=repeats))
+    load_seconds = min(
+        timeit.repeat(
+            lambda: MirrorState.load(io.StringIO(contents.getvalue())), number=1, repeat=repeats
+        )
+    )
+    click.echo(f"Dumped {num_repos} repos in {dump_seconds * 1e3:.1f}ms")
+    click.echo(f"Loaded {num_repos} repos in {load_seconds * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,15 @@
-from .main import main as main_cli
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .main import main as main_cli
 
 __all__ = ["main_cli"]
+
+
+def __getattr__(name: str) -> Any:
+    # Load the CLI on first use, so that importing a submodule does not load it.
+    if name == "main_cli":
+        from .main import main
+
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
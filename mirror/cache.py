@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+import contextlib
+from dataclasses import dataclass
+import errno
+import fcntl
+import os
+import shutil
+
+from git import GitCommandError
+from loguru import logger
+
+from .constants import (
+    MIRROR_ACCESS_EXTENSION,
+    MIRROR_CACHE,
+    MIRROR_FETCH_EXTENSION,
+    MIRROR_MONITOR_EXTENSION,
+    MIRROR_OBJECT_STORE,
+    MIRROR_OBJECT_STORE_LOCK,
+    MIRROR_PATCH_CACHE,
+    MIRROR_PATCH_CACHE_MAX_BYTES,
+    MIRROR_SEMAPHORE_EXTENSION,
+)
+from .githelper import GitHelper
+from .patch_cache import PatchCache
+from .typed_path import AbsDir, AbsFile, GitDir, RelDir
+
+# The semaphore is last so it is removed last.
+METADATA_EXTENSIONS = (
+    MIRROR_MONITOR_EXTENSION,
+    MIRROR_FETCH_EXTENSION,
+    MIRROR_ACCESS_EXTENSION,
+    MIRROR_SEMAPHORE_EXTENSION,
+)
+
+
+def disk_usage(path: AbsDir) -> int:
+    size = 0
+    for root, _, filenames in os.walk(path):
+        for filename in filenames:
+            with contextlib.suppress(OSError):
+                size += os.lstat(os.path.join(root, filename)).st_size
+    return size
+
+
+@dataclass(frozen=True)
+class CachedRepo:
+    path: AbsDir
+
+    @property
+    def semaphore(self) -> AbsFile:
+        return self.path + MIRROR_SEMAPHORE_EXTENSION
+
+    @property
+    def metadata(self) -> Sequence[AbsFile]:
+        return [self.path + extension for extension in METADATA_EXTENSIONS]
+
+    @property
+    def last_access(self) -> float:
+        for file in (self.path + MIRROR_ACCESS_EXTENSION, self.semaphore):
+            with contextlib.suppress(OSError):
+                return os.path.getmtime(file)
+        return 0.0
+
+    @property
+    def size(self) -> int:
+        return disk_usage(self.path)
+
+    def remove(self) -> bool:
+        """Remove the repo unless another process is using it."""
+        with open(self.semaphore, "a") as semaphore:
+            try:
+                fcntl.flock(semaphore, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as e:
+                if e.errno == errno.EWOULDBLOCK:
+                    return False
+                raise e
+            shutil.rmtree(self.path, ignore_errors=True)
+            for file in self.metadata:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(file)
+        return True
+
+
+class MirrorCache:
+    @classmethod
+    def repos(cls, cache: AbsDir | None = None) -> Iterator[CachedRepo]:
+        cache = MIRROR_CACHE if cache is None else cache
+        if not cache.exists():
+            return
+        names = set()
+        for entry in os.scandir(cache):
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in (
+                    os.fspath(MIRROR_OBJECT_STORE),
+                    os.fspath(MIRROR_PATCH_CACHE),
+                ):
+                    names.add(entry.name)
+                continue
+            for extension in METADATA_EXTENSIONS:
+                if entry.name.endswith(extension.extension):
+                    names.add(entry.name.removesuffix(extension.extension))
+        for name in sorted(names):
+            yield CachedRepo(cache / RelDir(name))
+
+    @classmethod
+    def gc(cls, max_bytes: int, cache: AbsDir | None = None) -> list[CachedRepo]:
+        """Remove the least recently used repos until the cache fits within `max_bytes`."""
+        cache = MIRROR_CACHE if cache is None else cache
+        repos = sorted(cls.repos(cache), key=lambda repo: repo.last_access, reverse=True)
+        # Metadata left behind without a clone is always removed.
+        removed = [repo for repo in repos if not repo.path.exists() and repo.remove()]
+        repos = [repo for repo in repos if repo not in removed]
+        kept: list[CachedRepo] = []
+        store = cache / MIRROR_OBJECT_STORE
+        sizes = [repo.size for repo in repos]
+        store_size = disk_usage(store)
+        # Patches count towards the size, but are cheap to recompute.
+        patches_size = PatchCache.evict(min(max_bytes, MIRROR_PATCH_CACHE_MAX_BYTES), cache)
+        total_size = sum(sizes) + store_size + patches_size
+        while repos and total_size > max_bytes:
+            repo, size = repos.pop(), sizes.pop()
+            if repo.remove():
+                logger.debug(f"Removed {repo.path} from the cache.")
+                removed.append(repo)
+                total_size -= size
+                if store.exists() and (repos or kept):
+                    # Evicting a repo only frees the objects that no other repo uses.
+                    cls.prune(store, [*repos, *kept])
+                    total_size -= store_size
+                    store_size = disk_usage(store)
+                    total_size += store_size
+            else:
+                logger.debug(f"Kept {repo.path} in the cache as it is in use.")
+                kept.append(repo)
+        if not any(True for _ in cls.repos(cache)):
+            # Nothing borrows from the object store anymore.
+            shutil.rmtree(store, ignore_errors=True)
+        return removed
+
+    @classmethod
+    def prune(cls, store: AbsDir, repos: Sequence[CachedRepo]) -> bool:
+        """Remove objects from the store that none of the repos can reach."""
+        with open(store / MIRROR_OBJECT_STORE_LOCK, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as e:
+                if e.errno == errno.EWOULDBLOCK:
+                    logger.debug(f"Kept all objects in {store} as it is in use.")
+                    return False
+                raise e
+            try:
+                keep = set().union(
+                    *(GitHelper.reachable_objects(GitDir(repo.path, check=False)) for repo in repos)
+                )
+                GitHelper.prune_objects(store, keep)
+            except GitCommandError as e:
+                logger.debug(e)
+                return False
+        return True
@@ -0,0 +1,106 @@
+import os
+import tempfile
+from unittest import mock
+
+import git
+import pytest
+
+from .cache import CachedRepo, MirrorCache, disk_usage
+from .constants import (
+    MIRROR_ACCESS_EXTENSION,
+    MIRROR_MONITOR_EXTENSION,
+    MIRROR_OBJECT_STORE,
+    MIRROR_SEMAPHORE_EXTENSION,
+)
+from .githelper import GitHelper
+from .lock import FileSystemSemaphore
+from .test_utils import add_commit
+from .typed_path import AbsDir, GitDir, RelDir, RelFile, Remote
+
+
+def add_cached_repo(cache: AbsDir, name: str, *, size: int, last_access: float) -> CachedRepo:
+    repo = CachedRepo(cache / RelDir(name))
+    repo.path.path.mkdir()
+    with open(repo.path / RelFile("file"), "wb") as f:
+        f.write(b"x" * size)
+    for extension in (MIRROR_SEMAPHORE_EXTENSION, MIRROR_MONITOR_EXTENSION):
+        (repo.path + extension).path.touch()
+    access = repo.path + MIRROR_ACCESS_EXTENSION
+    access.path.touch()
+    os.utime(access, (last_access, last_access))
+    return repo
+
+
+@pytest.mark.parametrize(
+    "max_bytes, expected_remaining",
+    [(0, []), (100, ["new"]), (250, ["middle", "new"]), (300, ["middle", "new", "old"])],
+)
+def test_gc_removes_least_recently_used(
+    max_bytes: int, expected_remaining: list[str], typed_tmp_path: AbsDir
+) -> None:
+    for name, last_access in [("old", 1.0), ("new", 3.0), ("middle", 2.0)]:
+        add_cached_repo(typed_tmp_path, name, size=100, last_access=last_access)
+    MirrorCache.gc(max_bytes, typed_tmp_path)
+    remaining = [repo.path.path.name for repo in MirrorCache.repos(typed_tmp_path)]
+    assert remaining == expected_remaining
+    assert sorted(os.listdir(typed_tmp_path)) == sorted(
+        name + suffix for name in expected_remaining for suffix in ("", ".access", ".sem", ".sync")
+    )
+
+
+def test_gc_keeps_repos_in_use(typed_tmp_path: AbsDir) -> None:
+    in_use = add_cached_repo(typed_tmp_path, "in_use", size=100, last_access=1.0)
+    add_cached_repo(typed_tmp_path, "unused", size=100, last_access=2.0)
+    (typed_tmp_path / MIRROR_OBJECT_STORE).path.mkdir()
+    semaphore = FileSystemSemaphore.acquire(in_use.semaphore)
+    removed = MirrorCache.gc(0, typed_tmp_path)
+    semaphore.release()
+    assert [repo.path.path.name for repo in removed] == ["unused"]
+    assert in_use.path.exists()
+    assert (typed_tmp_path / MIRROR_OBJECT_STORE).exists()
+
+
+def test_gc_removes_stale_files(typed_tmp_path: AbsDir) -> None:
+    (typed_tmp_path / RelFile("stale.sem")).path.touch()
+    (typed_tmp_path / RelFile("stale.sync")).path.touch()
+    (typed_tmp_path / MIRROR_OBJECT_STORE).path.mkdir()
+    MirrorCache.gc(0, typed_tmp_path)
+    assert os.listdir(typed_tmp_path) == []
+
+
+def test_gc_prunes_object_store(typed_tmp_path: AbsDir) -> None:
+    store = typed_tmp_path / MIRROR_OBJECT_STORE
+    git.Repo.init(store, bare=True)
+    blobs = {}
+    with mock.patch.object(GitHelper, "_object_store", return_value=store):
+        for name, last_access in [("evicted", 1.0), ("in_use", 2.0)]:
+            remote = tempfile.mkdtemp()
+            add_commit(remote, dict(file=f"{name} contents"))
+            local = GitDir(typed_tmp_path / RelDir(name), check=False)
+            GitHelper._clone(Remote(remote), local)
+            GitHelper._share_objects(local)
+            blobs[name] = git.Repo(local).git.rev_parse("HEAD:file")
+            access = local + MIRROR_ACCESS_EXTENSION
+            access.path.touch()
+            os.utime(access, (last_access, last_access))
+            (local + MIRROR_SEMAPHORE_EXTENSION).path.touch()
+
+    def stored_objects() -> list[str]:
+        return (
+            git.Repo(store)
+            .git.cat_file("--batch-all-objects", "--batch-check=%(objectname)")
+            .splitlines()
+        )
+
+    assert blobs["evicted"] in stored_objects()
+    size = disk_usage(typed_tmp_path)
+    semaphore = FileSystemSemaphore.acquire(CachedRepo(typed_tmp_path / RelDir("in_use")).semaphore)
+    removed = MirrorCache.gc(0, typed_tmp_path)
+    semaphore.release()
+
+    assert [repo.path.path.name for repo in removed] == ["evicted"]
+    assert disk_usage(typed_tmp_path) < size
+    assert blobs["in_use"] in stored_objects()
+    assert blobs["evicted"] not in stored_objects()
+    in_use = git.Repo(typed_tmp_path / RelDir("in_use"))
+    assert in_use.git.show("HEAD:file") == "in_use contents"
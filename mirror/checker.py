@@ -2,18 +2,26 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+from loguru import logger
+
+from .constants import MIRROR_NAME
 from .manager import ExistingMirrorManager
 from .types import ExitCode
 
 
 @dataclass(frozen=True)
 class MirrorChecker(ExistingMirrorManager):
-    def check(self) -> ExitCode:
+    def check(self, *, pre_commit: bool = False) -> ExitCode:
         lock = self.lock
         try:
-            return self._check()
+            return_value = self._check()
         finally:
             lock.release()
+        if return_value and pre_commit:
+            logger.critical(
+                f"{MIRROR_NAME} config files are not up to date; run `mirror sync` to update."
+            )
+        return return_value
 
     def _check(self) -> ExitCode:
         return self.mirror.check()
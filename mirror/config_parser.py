@@ -2,13 +2,20 @@ from collections.abc import Callable, Collection
 from dataclasses import dataclass, field
 import difflib
 import functools
-import inspect
-from typing import Any, NoReturn, cast
+import io
+import os
+from typing import IO, Any, Concatenate, NoReturn, cast
 
 import yaml
 from yaml import MappingNode, Node, ScalarNode, SequenceNode, YAMLError
 
+try:
+    from yaml import CSafeLoader as FastLoader
+except ImportError:
+    from yaml import SafeLoader as FastLoader  # type: ignore [assignment]
+
 from .config import MirrorConfig, MirrorFileConfig, MirrorRepoConfig
+from .constants import MIRROR_CONFIG_CACHE_SIZE
 from .logger import describe
 from .typed_path import AbsFile, RelFile, Remote, TypedPath
 
@@ -35,9 +42,34 @@ class ParserError(YAMLError):
         return f"An unexpected error occurred during parsing @ {self.position}: {self.msg}"
 
 
+def tracks_node[N: Node, **P, R](
+    method: Callable[Concatenate["Parser", N, P], R],
+) -> Callable[Concatenate["Parser", N, P], R]:
+    """Use the node as the context for any errors raised by the method."""
+
+    @functools.wraps(method)
+    def wrapper(self: "Parser", node: N, /, *args: P.args, **kwargs: P.kwargs) -> R:
+        if node is None or node is self._node:
+            return method(self, node, *args, **kwargs)
+        # Set nodes before to stop RecursionError during fail.
+        previous_node = self._node
+        self._node = node
+        if id(node) in self._visited_nodes:
+            self.fail("recursive reference detected.", node=node)
+        self._visited_nodes.add(id(node))
+        try:
+            return method(self, node, *args, **kwargs)
+        finally:
+            self._node = previous_node
+            self._visited_nodes.remove(id(node))
+
+    return wrapper
+
+
 @dataclass
 class Parser:
     filepath: AbsFile | RelFile
+    contents: str | None = field(default=None, repr=False, compare=False)
     _node: Node = field(
         init=False, repr=False, hash=False, compare=False, default=Node("", None, None, None)
     )
@@ -51,38 +83,6 @@ class Parser:
         init=False, repr=False, hash=False, compare=False, default_factory=set
     )
 
-    def __post_init__(self) -> None:
-        self._wrap_methods()
-
-    def _wrap_methods(self) -> None:
-        for attr in dir(self):
-            method = getattr(self, attr)
-            if not attr.startswith("__") and inspect.ismethod(method):
-                setattr(self, attr, self._context_wrap(method))
-
-    def _context_wrap[**P, R](self, method: Callable[P, R]) -> Callable[P, R]:
-        signature = inspect.signature(method, eval_str=False)
-
-        @functools.wraps(method)
-        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-            binding = signature.bind(*args, **kwargs)
-            node = binding.arguments.get("node")
-            if node is None or node is self._node:
-                return method(*args, **kwargs)
-            # Set nodes before to stop RecursionError during fail.
-            previous_node = self._node
-            self._node = node
-            if id(node) in self._visited_nodes:
-                self.fail("recursive reference detected.", node=node)
-            self._visited_nodes.add(id(node))
-            try:
-                return method(*args, **kwargs)
-            finally:
-                self._node = previous_node
-                self._visited_nodes.remove(id(node))
-
-        return wrapper
-
     @property
     def context(self) -> Context:
         return Context(self.filepath, self._node)
@@ -114,6 +114,7 @@ class Parser:
             case _:
                 return "unknown"
 
+    @tracks_node
     def parse_mapping[T](
         self,
         node: Node,
@@ -140,6 +141,7 @@ class Parser:
                 self.fail(f"{name} mapping is missing the key {key!r}.")
         return combine(**results)
 
+    @tracks_node
     def parse_sequence[T](
         self, node: Node, subparser: Callable[[Node], T], *, names: str
     ) -> list[T]:
@@ -150,6 +152,7 @@ class Parser:
                 return [subparser(node) for node in node.value]
         return self.fail(f"expected sequence of {names}, got {self.type_of(node)}.")
 
+    @tracks_node
     def _relfile_from_scalar_node(self, node: ScalarNode) -> RelFile:
         file = RelFile(node.value)
         if file.path.is_absolute():
@@ -185,6 +188,7 @@ class Parser:
             file_config.target, node, visited=self._visited_filenames, name="file"
         )
 
+    @tracks_node
     def parse_mirror_file_config(self, node: Node) -> MirrorFileConfig:
         file_config = None
         match node:
@@ -203,6 +207,7 @@ class Parser:
         self._check_duplicate_file(file_config, node)
         return file_config
 
+    @tracks_node
     def parse_string_key[T: str](self, node: Node, options: Collection[T]) -> T:
         match node:
             case ScalarNode() if isinstance(key := node.value, str):
@@ -220,6 +225,7 @@ class Parser:
     def _check_duplicate_remote(self, remote: Remote, node: Node) -> None:
         self._check_duplicate(remote, node, visited=self._visited_repos, name="source")
 
+    @tracks_node
     def parse_remote(self, node: Node) -> Remote:
         match node:
             case ScalarNode() if isinstance(node.value, str):
@@ -228,9 +234,11 @@ class Parser:
                 return remote
         return self.fail(f"expected remote as a string, got {self.type_of(node)}.")
 
+    @tracks_node
     def parse_mirror_file_configs(self, node: Node) -> list[MirrorFileConfig]:
         return self.parse_sequence(node, self.parse_mirror_file_config, names="files")
 
+    @tracks_node
     def parse_mirror_repo_config(self, node: Node) -> MirrorRepoConfig:
         return self.parse_mapping(
             node,
@@ -239,9 +247,11 @@ class Parser:
             name="repo",
         )
 
+    @tracks_node
     def parse_repo_configs(self, node: Node) -> list[MirrorRepoConfig]:
         return self.parse_sequence(node, self.parse_mirror_repo_config, names="repos")
 
+    @tracks_node
     def parse_mirror_config(self, node: Node) -> MirrorConfig:
         return self.parse_mapping(
             node,
@@ -251,12 +261,46 @@ class Parser:
         )
 
     def parse(self) -> MirrorConfig:
-        with open(self.filepath) as f:
-            tree = yaml.compose(f)
-        return self.parse_mirror_config(tree)
+        return self.parse_mirror_config(self.compose())
+
+    def compose(self) -> Node:
+        with self.stream() as f:
+            try:
+                return yaml.compose(f, Loader=FastLoader)
+            except YAMLError:
+                # Recompose in Python for consistent error messages.
+                f.seek(0)
+                return yaml.compose(f)
+
+    def stream(self) -> IO[str]:
+        if self.contents is None:
+            return open(self.filepath)
+        return io.StringIO(self.contents)
 
     @classmethod
     @describe("Parsing config")
     def parse_file(cls, filepath: AbsFile | RelFile) -> MirrorConfig:
         parser = cls(filepath)
         return parser.parse()
+
+    @classmethod
+    @describe("Parsing config")
+    def parse_file_cached(cls, filepath: AbsFile | RelFile) -> MirrorConfig:
+        """Parse `filepath`, reusing the result while the file is unchanged."""
+        stat = os.stat(filepath)
+        return cls._parse_file_version(filepath, stat.st_mtime_ns, stat.st_size)
+
+    @classmethod
+    @functools.lru_cache(maxsize=MIRROR_CONFIG_CACHE_SIZE)
+    def _parse_file_version(
+        cls, filepath: AbsFile | RelFile, mtime_ns: int, size: int
+    ) -> MirrorConfig:
+        parser = cls(filepath)
+        return parser.parse()
+
+    @classmethod
+    @describe("Parsing config")
+    def parse_contents(cls, filepath: AbsFile | RelFile, contents: str) -> MirrorConfig:
+        """Parse `contents`, reporting errors as coming from `filepath`."""
+        parser = cls(filepath, contents)
+        return parser.parse()
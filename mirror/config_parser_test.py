@@ -1,11 +1,14 @@
 import tempfile
+from unittest import mock
 
 import git
 from inline_snapshot import snapshot
 from inline_snapshot._snapshot.undecided_value import UndecidedValue
 import pytest
+import yaml
 from yaml import Node, YAMLError
 
+from . import config_parser
 from .config import MirrorConfig, MirrorFileConfig, MirrorRepoConfig
 from .config_parser import Parser, ParserError
 from .test_utils import normalize_message
@@ -600,3 +603,32 @@ def test_parse_files(filename: str, expected: MirrorConfig | str, test_data_path
         assert normalize_message(e, test_data_path=test_data_path) == expected
     else:
         assert Parser.parse_file(filepath) == expected
+
+
+@pytest.mark.parametrize(
+    "filename", ["multiple.yaml", "content_error.yaml", "execution.yaml", "syntax_error.yaml"]
+)
+def test_parse_files_fast_loader(filename: str, test_data_path: AbsDir) -> None:
+    filepath = test_data_path / RelFile(filename)
+
+    def parse() -> MirrorConfig | str:
+        try:
+            return Parser.parse_file(filepath)
+        except YAMLError as e:
+            return str(e)
+
+    fast_result = parse()
+    with mock.patch.object(config_parser, "FastLoader", yaml.SafeLoader):
+        assert parse() == fast_result
+
+
+def test_parse_file_cached(typed_tmp_path: AbsDir) -> None:
+    filepath = typed_tmp_path / RelFile(".mirror.yaml")
+    with open(filepath, "w") as f:
+        f.write("repos:\n  - source: https://github.com/a/b\n    files: [file]\n")
+    config = Parser.parse_file_cached(filepath)
+    assert Parser.parse_file_cached(filepath) is config
+
+    with open(filepath, "a") as f:
+        f.write("  - source: https://github.com/c/d\n    files: [other]\n")
+    assert len(Parser.parse_file_cached(filepath).repos) == 2
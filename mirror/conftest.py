@@ -3,6 +3,7 @@ import os
 from pathlib import Path
 import sys
 import textwrap
+from unittest import mock
 
 import git
 from inline_snapshot import external_file
@@ -13,6 +14,7 @@ from pytest import FixtureRequest, LogCaptureFixture
 import yaml
 from yaml import Node
 
+from .githelper import GitHelper
 from .logger import ProgramState
 from .typed_path import AbsDir, AbsFile, Ext, GitDir, RelDir, RelFile
 
@@ -75,3 +77,19 @@ def yaml_node(raw_yaml: str) -> Node:
 @pytest.fixture(autouse=True)
 def set_mock_command() -> None:
     ProgramState.command = "test"  # type: ignore [assignment]
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path_factory: pytest.TempPathFactory) -> Generator[AbsDir]:
+    """Keep clones and the object store out of the user's cache."""
+    cache = AbsDir(tmp_path_factory.mktemp("cache"))
+    GitHelper._object_store.cache_clear()
+    GitHelper._head_tree_index.cache_clear()
+    with (
+        mock.patch("mirror.cache.MIRROR_CACHE", cache),
+        mock.patch("mirror.githelper.MIRROR_CACHE", cache),
+        mock.patch("mirror.patch_cache.MIRROR_CACHE", cache),
+        mock.patch("mirror.repo.MIRROR_CACHE", cache),
+    ):
+        yield cache
+    GitHelper._object_store.cache_clear()
@@ -2,7 +2,7 @@ from pathlib import Path
 
 import platformdirs
 
-from .typed_path import AbsDir, Ext, RelFile
+from .typed_path import AbsDir, AbsFile, Ext, RelDir, RelFile
 
 MIRROR_NAME: str = "Mirror|rorriM"
 
@@ -10,9 +10,29 @@ MIRROR_LOCK: RelFile = RelFile(Path(".mirror.lock"))
 MIRROR_FILE: RelFile = RelFile(Path(".mirror.yaml"))
 MIRROR_SEMAPHORE_EXTENSION: Ext = Ext(".sem")
 MIRROR_MONITOR_EXTENSION: Ext = Ext(".sync")
+MIRROR_FETCH_EXTENSION: Ext = Ext(".fetch")
+MIRROR_ACCESS_EXTENSION: Ext = Ext(".access")
+# Created when first used, rather than on import.
 MIRROR_CACHE: AbsDir = AbsDir(Path(platformdirs.user_cache_dir("mirror")))
+MIRROR_OBJECT_STORE: RelDir = RelDir("objects")
+MIRROR_OBJECT_STORE_LOCK: RelFile = RelFile("mirror.lock")
+MIRROR_PATCH_CACHE: RelDir = RelDir("patches")
+MIRROR_PATCH_EXTENSION: Ext = Ext(".patch")
+MIRROR_BLOB_EXTENSION: Ext = Ext(".blob")
+MIRROR_PATCH_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+# Kept in the git directory of each cached repo.
+MIRROR_TREE_INDEX: RelDir = RelDir("mirror-trees")
+MIRROR_TREE_INDEX_LIMIT: int = 4
+MIRROR_CONFIG_CACHE_SIZE: int = 16
+MIRROR_DAEMON_SOCKET: AbsFile = MIRROR_CACHE / RelFile("daemon.sock")
 
-MIRROR_CACHE.path.mkdir(parents=True, exist_ok=True)
+MIRROR_CLONE_FILTER: str | None = "blob:none"
+MIRROR_CLONE_DEPTH: int | None = 1
+
+MIRROR_DEFAULT_JOBS: int = 8
+MIRROR_DEFAULT_JOBS_PER_HOST: int = 4
+MIRROR_DEFAULT_CACHE_TTL: float = 0.0
+MIRROR_DEFAULT_LOCK_TIMEOUT: float = 600.0
 
 
 LOADING_SUFFIX = "..."
@@ -1,12 +1,21 @@
+import os
 from pathlib import Path
+import subprocess
+import sys
 
 from .constants import MIRROR_CACHE
+from .typed_path import AbsDir
 
 
 def test_mirror_cache_path() -> None:
     assert MIRROR_CACHE.path == Path("~/.cache/mirror").expanduser()
 
 
-def test_mirror_cache_exists_as_folder() -> None:
-    assert MIRROR_CACHE.exists()
-    assert MIRROR_CACHE.is_folder()
+def test_mirror_cache_not_created_on_import(typed_tmp_path: AbsDir) -> None:
+    subprocess.run(
+        [sys.executable, "-c", "import mirror.constants"],
+        check=True,
+        cwd=Path(__file__).parent.parent,
+        env=os.environ | dict(XDG_CACHE_HOME=os.fspath(typed_tmp_path)),
+    )
+    assert os.listdir(typed_tmp_path) == []
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Sequence
+import contextlib
+import dataclasses
+from dataclasses import dataclass
+import json
+import os
+import socket
+import socketserver
+from typing import Any, ClassVar
+
+from loguru import logger
+
+from .constants import (
+    MIRROR_DAEMON_SOCKET,
+    MIRROR_DEFAULT_CACHE_TTL,
+    MIRROR_DEFAULT_JOBS,
+    MIRROR_DEFAULT_JOBS_PER_HOST,
+    MIRROR_DEFAULT_LOCK_TIMEOUT,
+)
+from .logger import ProgramState, error_message
+from .typed_path import AbsDir, AbsFile, GitDir
+from .types import ExitCode
+
+
+@dataclass(frozen=True)
+class DaemonRequest:
+    command: ProgramState.CommandName
+    target: str
+    log_level: str | int = "INFO"
+    pre_commit: bool = False
+    jobs: int = MIRROR_DEFAULT_JOBS
+    jobs_per_host: int = MIRROR_DEFAULT_JOBS_PER_HOST
+    cache_ttl: float = MIRROR_DEFAULT_CACHE_TTL
+    lock_timeout: float = MIRROR_DEFAULT_LOCK_TIMEOUT
+
+    SETTINGS: ClassVar[Sequence[str]] = ("jobs", "jobs_per_host", "cache_ttl", "lock_timeout")
+
+    def encode(self) -> bytes:
+        return json.dumps(dataclasses.asdict(self)).encode() + b"\n"
+
+    @classmethod
+    def decode(cls, line: bytes) -> DaemonRequest:
+        return cls(**json.loads(line))
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            # Clients probing whether the daemon is running send nothing.
+            return
+        request = DaemonRequest.decode(line)
+        sink = logger.add(self._forward, level=request.log_level, format="{message}")
+        try:
+            exitcode = MirrorDaemon.run(request)
+        finally:
+            logger.remove(sink)
+        self._send(exitcode=exitcode)
+
+    def _forward(self, message: Any) -> None:
+        record = message.record
+        self._send(level=record["level"].name, message=record["message"])
+
+    def _send(self, **response: Any) -> None:
+        with contextlib.suppress(OSError):
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class MirrorDaemon:
+    """Serve `check` and `sync` from one process, so that repos and git processes stay warm."""
+
+    CONNECTION_TIMEOUT_SECONDS: ClassVar[float] = 1.0
+    # The inode and modification time of each cached repo after the last request.
+    _repo_versions: ClassVar[dict[GitDir, tuple[int, int]]] = {}
+
+    @classmethod
+    def serve(cls, socket_path: AbsFile = MIRROR_DAEMON_SOCKET) -> None:
+        with cls.server(socket_path) as server:
+            logger.info(f"Listening on {socket_path}.")
+            try:
+                server.serve_forever()
+            finally:
+                os.remove(socket_path)
+
+    @classmethod
+    def server(cls, socket_path: AbsFile = MIRROR_DAEMON_SOCKET) -> socketserver.UnixStreamServer:
+        # Requests are handled one at a time, as they share the program state.
+        socket_path.path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            if (connection := cls._connect(socket_path)) is not None:
+                connection.close()
+                raise RuntimeError(f"A daemon is already listening on {socket_path}.")
+            os.remove(socket_path)
+        return socketserver.UnixStreamServer(os.fspath(socket_path), DaemonRequestHandler)
+
+    @classmethod
+    def run(cls, request: DaemonRequest) -> ExitCode:
+        with cls._settings(request):
+            return cls._run(request)
+
+    @classmethod
+    @contextlib.contextmanager
+    def _settings(cls, request: DaemonRequest) -> Iterator[None]:
+        """Use the client's settings for one request."""
+        settings = {name: getattr(ProgramState, name) for name in request.SETTINGS}
+        for name in request.SETTINGS:
+            setattr(ProgramState, name, getattr(request, name))
+        try:
+            yield
+        finally:
+            for name, value in settings.items():
+                setattr(ProgramState, name, value)
+
+    @classmethod
+    def _run(cls, request: DaemonRequest) -> ExitCode:
+        # Only the daemon needs these, so clients forwarding requests start quickly.
+        from .checker import MirrorChecker
+        from .githelper import GitHelper
+        from .syncer import MirrorSyncer
+
+        cls._forget_replaced_repos()
+        # Checkouts are cached per command and hold the semaphores that other processes wait on.
+        GitHelper.checkout.cache_clear()
+        # Other processes may have moved HEAD, but the index of each commit is still on disk.
+        GitHelper._head_tree_index.cache_clear()
+        ProgramState.command = request.command
+        try:
+            target = GitDir(request.target)
+            match request.command:
+                case "check":
+                    return MirrorChecker(target).check(pre_commit=request.pre_commit)
+                case "sync":
+                    MirrorSyncer(target).sync()
+                    return 0
+            raise ValueError(f"Unable to run {request.command!r} in the daemon.")
+        except Exception as e:  # noqa: BLE001
+            logger.exception(error_message(e))
+            return 1
+        finally:
+            cls._record_repos()
+
+    @classmethod
+    def _version(cls, path: AbsDir) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @classmethod
+    def _forget_replaced_repos(cls) -> None:
+        """Drop the open repos and readers of cached repos that were removed or cloned again."""
+        from .githelper import GitHelper
+
+        for local, version in list(cls._repo_versions.items()):
+            if cls._version(local) != version:
+                GitHelper.forget(local)
+                del cls._repo_versions[local]
+
+    @classmethod
+    def _record_repos(cls) -> None:
+        from .cache import MirrorCache
+
+        with contextlib.suppress(OSError):
+            for repo in MirrorCache.repos():
+                if (version := cls._version(repo.path)) is not None:
+                    cls._repo_versions[GitDir(repo.path, check=False)] = version
+
+    @classmethod
+    def forward(
+        cls, request: DaemonRequest, socket_path: AbsFile = MIRROR_DAEMON_SOCKET
+    ) -> ExitCode | None:
+        """Run the request in the daemon, or return `None` if no daemon is running."""
+        connection = cls._connect(socket_path)
+        if connection is None:
+            return None
+        with connection, connection.makefile("rwb") as f:
+            f.write(request.encode())
+            f.flush()
+            return cls._receive(f)
+
+    @classmethod
+    def _connect(cls, socket_path: AbsFile) -> socket.socket | None:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(cls.CONNECTION_TIMEOUT_SECONDS)
+        try:
+            connection.connect(os.fspath(socket_path))
+        except OSError:
+            connection.close()
+            return None
+        connection.settimeout(None)
+        return connection
+
+    @classmethod
+    def _receive(cls, f: Iterable[bytes]) -> ExitCode:
+        for line in f:
+            response = json.loads(line)
+            if "exitcode" in response:
+                return response["exitcode"]
+            logger.log(response["level"], response["message"])
+        raise ConnectionError("Lost connection to the daemon.")
@@ -0,0 +1,144 @@
+from collections.abc import Generator
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from loguru import logger
+import pytest
+
+from .constants import MIRROR_FILE
+from .daemon import DaemonRequest, MirrorDaemon
+from .githelper import GitHelper
+from .installer import MirrorInstaller
+from .logger import ProgramState
+from .syncer import MirrorSyncer
+from .test_utils import add_commit
+from .typed_path import AbsDir, AbsFile, GitDir, RelDir, RelFile, Remote
+
+
+@pytest.fixture
+def daemon_socket() -> Generator[AbsFile]:
+    socket_path = AbsDir(tempfile.mkdtemp()) / RelFile("daemon.sock")
+    server = MirrorDaemon.server(socket_path)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def test_forward_without_daemon(typed_tmp_path: AbsDir) -> None:
+    request = DaemonRequest("sync", os.fspath(typed_tmp_path))
+    assert MirrorDaemon.forward(request, typed_tmp_path / RelFile("daemon.sock")) is None
+
+
+def test_server_refuses_to_replace_running_daemon(daemon_socket: AbsFile) -> None:
+    with pytest.raises(RuntimeError):
+        MirrorDaemon.server(daemon_socket)
+
+
+def test_daemon_sync_and_check(local_git_repo: GitDir, daemon_socket: AbsFile) -> None:
+    remote = tempfile.mkdtemp()
+    add_commit(remote, dict(file="v1"))
+    config = f"repos:\n  - source: {remote}\n    files:\n      - file\n"
+    add_commit(local_git_repo, {os.fspath(MIRROR_FILE): config})
+    MirrorInstaller(target=local_git_repo, source=local_git_repo / MIRROR_FILE).install()
+    target = os.fspath(local_git_repo)
+
+    for contents in ("v2", "v3"):
+        add_commit(remote, dict(file=contents))
+        assert MirrorDaemon.forward(DaemonRequest("check", target), daemon_socket) == 1
+        assert MirrorDaemon.forward(DaemonRequest("sync", target), daemon_socket) == 0
+        with open(local_git_repo / RelFile("file")) as f:
+            assert f.read() == contents
+        assert MirrorDaemon.forward(DaemonRequest("check", target), daemon_socket) == 0
+
+
+def test_daemon_forwards_errors(typed_tmp_path: AbsDir, daemon_socket: AbsFile) -> None:
+    messages: list[str] = []
+    sink = logger.add(messages.append, level="ERROR", format="{message}")
+    try:
+        request = DaemonRequest("sync", os.fspath(typed_tmp_path))
+        assert MirrorDaemon.forward(request, daemon_socket) == 1
+    finally:
+        logger.remove(sink)
+    assert any(message.startswith("InvalidGitRepositoryError") for message in messages)
+
+
+def test_daemon_uses_request_settings(typed_tmp_path: AbsDir) -> None:
+    settings: list[tuple[int, int, float, float]] = []
+
+    def record_settings(self: MirrorSyncer) -> None:
+        settings.append(
+            (
+                ProgramState.jobs,
+                ProgramState.jobs_per_host,
+                ProgramState.cache_ttl,
+                ProgramState.lock_timeout,
+            )
+        )
+
+    request = DaemonRequest(
+        "sync", os.fspath(typed_tmp_path), jobs=3, jobs_per_host=2, cache_ttl=0.0, lock_timeout=5.0
+    )
+    previous = (
+        ProgramState.jobs,
+        ProgramState.jobs_per_host,
+        ProgramState.cache_ttl,
+        ProgramState.lock_timeout,
+    )
+    with (
+        mock.patch("mirror.daemon.GitDir"),
+        mock.patch.object(MirrorSyncer, "sync", record_settings),
+    ):
+        assert MirrorDaemon.run(request) == 0
+    assert settings == [(3, 2, 0.0, 5.0)]
+    assert (
+        ProgramState.jobs,
+        ProgramState.jobs_per_host,
+        ProgramState.cache_ttl,
+        ProgramState.lock_timeout,
+    ) == previous
+
+
+def test_daemon_sync_after_cache_is_replaced(
+    local_git_repo: GitDir, daemon_socket: AbsFile, isolated_cache: AbsDir
+) -> None:
+    remote = tempfile.mkdtemp()
+    add_commit(remote, dict(file="v1"))
+    config = f"repos:\n  - source: {remote}\n    files:\n      - file\n"
+    add_commit(local_git_repo, {os.fspath(MIRROR_FILE): config})
+    MirrorInstaller(target=local_git_repo, source=local_git_repo / MIRROR_FILE).install()
+    target = os.fspath(local_git_repo)
+
+    add_commit(remote, dict(file="v2"))
+    assert MirrorDaemon.forward(DaemonRequest("sync", target), daemon_socket) == 0
+    shutil.rmtree(isolated_cache / RelDir(Remote(remote).hash))
+    add_commit(remote, dict(file="v3"))
+    assert MirrorDaemon.forward(DaemonRequest("sync", target), daemon_socket) == 0
+    with open(local_git_repo / RelFile("file")) as f:
+        assert f.read() == "v3"
+
+
+def test_daemon_keeps_unchanged_repos_open(
+    local_git_repo: GitDir, daemon_socket: AbsFile, isolated_cache: AbsDir
+) -> None:
+    remote = tempfile.mkdtemp()
+    add_commit(remote, dict(file="v1"))
+    config = f"repos:\n  - source: {remote}\n    files:\n      - file\n"
+    add_commit(local_git_repo, {os.fspath(MIRROR_FILE): config})
+    MirrorInstaller(target=local_git_repo, source=local_git_repo / MIRROR_FILE).install()
+    target = os.fspath(local_git_repo)
+    cache = GitDir(isolated_cache / RelDir(Remote(remote).hash), check=False)
+
+    assert MirrorDaemon.forward(DaemonRequest("sync", target), daemon_socket) == 0
+    repo = GitHelper.repo(cache)
+    add_commit(remote, dict(file="v2"))
+    assert MirrorDaemon.forward(DaemonRequest("sync", target), daemon_socket) == 0
+    assert GitHelper.repo(cache) is repo
+    shutil.rmtree(cache)
+    assert MirrorDaemon.forward(DaemonRequest("sync", target), daemon_socket) == 0
+    assert GitHelper.repo(cache) is not repo
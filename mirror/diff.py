@@ -1,3 +1,7 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Sequence
 import contextlib
 from dataclasses import KW_ONLY, dataclass
 import os
@@ -10,7 +14,8 @@ from .constants import MIRROR_FILE
 from .file import MirrorFile, VersionedMirrorFile
 from .githelper import GitHelper
 from .logger import ProgramState, describe
-from .typed_path import GitDir
+from .patch_cache import PatchCache, PatchKey, RawPatch
+from .typed_path import GitDir, RelFile, Remote
 from .types import Commit
 
 
@@ -22,25 +27,93 @@ class Diff:
     blob: bytes | None
 
     @classmethod
-    def from_file(cls, repo: GitDir, file: VersionedMirrorFile) -> Self:
-        return cls.from_commit(file.commit, repo, file.file)
+    def from_file(
+        cls, repo: GitDir, file: VersionedMirrorFile, *, source: Remote | None = None
+    ) -> Self:
+        return cls.from_commit(file.commit, repo, file.file, source=source)
 
     @classmethod
-    def from_commit(cls, commit: Commit | None, repo: GitDir, file: MirrorFile) -> Self:
-        if commit is None:
-            return cls.empty(repo, file)
-        return cls._from_commit(commit, repo, file)
+    def from_files(
+        cls, repo: GitDir, files: Sequence[VersionedMirrorFile], *, source: Remote | None = None
+    ) -> list[Self]:
+        groups: defaultdict[Commit | None, list[MirrorFile]] = defaultdict(list)
+        for file in files:
+            groups[file.commit].append(file.file)
+        diffs: dict[MirrorFile, Self] = {}
+        for commit, group in groups.items():
+            diffs.update(
+                zip(group, cls.from_commits(commit, repo, group, source=source), strict=True)
+            )
+        return [diffs[file.file] for file in files]
+
+    @classmethod
+    def from_commit(
+        cls, commit: Commit | None, repo: GitDir, file: MirrorFile, *, source: Remote | None = None
+    ) -> Self:
+        [diff] = cls.from_commits(commit, repo, [file], source=source)
+        return diff
+
+    @classmethod
+    def from_commits(
+        cls,
+        commit: Commit | None,
+        repo: GitDir,
+        files: Sequence[MirrorFile],
+        *,
+        source: Remote | None = None,
+    ) -> list[Self]:
+        sources = list(dict.fromkeys(file.source for file in files))
+        if source is None:
+            patches = cls._raw_patches(commit, repo, sources)
+        else:
+            patches = cls._cached_patches(commit, repo, sources, source)
+        # Only the paths depend on the target.
+        return [
+            cls(
+                file=file,
+                patch=cls.update_patch(patches[file.source].patch, file, new=commit is None),
+                blob=patches[file.source].blob,
+            )
+            for file in files
+        ]
+
+    @classmethod
+    def _cached_patches(
+        cls, commit: Commit | None, repo: GitDir, files: Sequence[RelFile], source: Remote
+    ) -> dict[RelFile, RawPatch]:
+        try:
+            new_commit = Commit(GitHelper.commit(repo))
+        except ValueError:
+            # Without a commit, there is nothing to key the patches on.
+            return cls._raw_patches(commit, repo, files)
+        keys = {file: PatchKey(source, commit, new_commit, file) for file in files}
+        patches = {
+            file: patch for file in files if (patch := PatchCache.get(keys[file])) is not None
+        }
+        missing = [file for file in files if file not in patches]
+        if missing:
+            computed = cls._raw_patches(commit, repo, missing)
+            PatchCache.put_all({keys[file]: patch for file, patch in computed.items()})
+            patches.update(computed)
+        return patches
 
     @classmethod
-    def _from_commit(cls, commit: Commit, repo: GitDir, file: MirrorFile) -> Self:
-        patch = GitHelper.file_diff(repo, commit, file.source)
-        blob = GitHelper.file_blob(repo, commit, file.source)
-        return cls(file=file, patch=cls.update_patch(patch, file, new=False), blob=blob)
+    def _raw_patches(
+        cls, commit: Commit | None, repo: GitDir, files: Sequence[RelFile]
+    ) -> dict[RelFile, RawPatch]:
+        if commit is None:
+            patches = GitHelper.file_diffs(repo, None, files)
+            return {file: RawPatch(patches[file], None) for file in files}
+        GitHelper.ensure_commit(repo, commit)
+        patches = GitHelper.file_diffs(repo, commit, files)
+        blobs = GitHelper.file_blobs(repo, commit, files)
+        return {
+            file: RawPatch(patches[file], blob) for file, blob in zip(files, blobs, strict=True)
+        }
 
     @classmethod
     def empty(cls, repo: GitDir, file: MirrorFile) -> Self:
-        patch = GitHelper.fresh_diff(repo, file.source)
-        return cls(file=file, patch=cls.update_patch(patch, file, new=True), blob=None)
+        return cls.from_commit(None, repo, file)
 
     @classmethod
     def update_patch(cls, patch: str, file: MirrorFile, *, new: bool) -> str:
@@ -91,22 +164,57 @@ class Diff:
 
     def apply(self, local: GitDir) -> None:
         self._add_file(local)
-        self._hash_blob(local)
+        self._write_blobs([self], local)
         self._apply_patch(local)
 
+    @classmethod
+    def apply_all(cls, diffs: Sequence[Diff], local: GitDir) -> None:
+        diffs = [diff for diff in diffs if diff.patch]
+        if not diffs:
+            return
+        cls._add_files(diffs, local)
+        cls._write_blobs(diffs, local)
+        cls._apply_patches(diffs, local)
+
     def _add_file(self, local: GitDir) -> None:
         with contextlib.suppress(git.GitCommandError):
             GitHelper.add(local, self.file.target)
 
-    def _hash_blob(self, local: GitDir) -> None:
-        if self.blob is not None:
-            GitHelper.hash_object(local, self.blob)
+    @classmethod
+    def _add_files(cls, diffs: Sequence[Diff], local: GitDir) -> None:
+        targets = [diff.file.target for diff in diffs if (local / diff.file.target).exists()]
+        if not targets:
+            return
+        try:
+            GitHelper.add(local, *targets)
+        except git.GitCommandError as e:
+            logger.debug(e)
+            for diff in diffs:
+                diff._add_file(local)
+
+    @classmethod
+    def _write_blobs(cls, diffs: Sequence[Diff], local: GitDir) -> None:
+        blobs = [diff.blob for diff in diffs if diff.blob is not None and diff.patch]
+        if blobs:
+            GitHelper.write_blobs(local, blobs)
 
     def _apply_patch(self, local: GitDir) -> None:
-        with describe(f"Applying patch from {self.file.source} to {self.file.target}"):
-            logger.trace(f"patch = {self.patch}")
+        with describe("Applying patch from {} to {}", self.file.source, self.file.target):
+            logger.opt(lazy=True).trace("patch = {}", lambda: self.patch)
             GitHelper.apply_patch(local, self.patch)
-            if self.patch and self.file.target == MIRROR_FILE and ProgramState.command == "sync":
-                logger.warning(
-                    f"{MIRROR_FILE} modified while syncing. Please merge any conflicts then rerun to sync any added files."
-                )
+            self._check_mirror_file()
+
+    @classmethod
+    def _apply_patches(cls, diffs: Sequence[Diff], local: GitDir) -> None:
+        with describe("Applying {} patches to {}", len(diffs), local):
+            patch = str.join("", (diff.patch for diff in diffs))
+            logger.opt(lazy=True).trace("patch = {}", lambda: patch)
+            GitHelper.apply_patch(local, patch)
+            for diff in diffs:
+                diff._check_mirror_file()
+
+    def _check_mirror_file(self) -> None:
+        if self.patch and self.file.target == MIRROR_FILE and ProgramState.command == "sync":
+            logger.warning(
+                f"{MIRROR_FILE} modified while syncing. Please merge any conflicts then rerun to sync any added files."
+            )
@@ -3,6 +3,7 @@ import shutil
 import stat
 import tempfile
 import textwrap
+from unittest import mock
 
 import _pytest.fixtures
 from inline_snapshot._external._external_file import ExternalFile
@@ -10,7 +11,8 @@ import pytest
 
 from .diff import Diff
 from .file import MirrorFile
-from .test_utils import add_commit, quick_mirror_file
+from .githelper import GitHelper
+from .test_utils import add_commit, quick_mirror_file, quick_versioned_mirror_file
 from .typed_path import AbsDir, Ext, GitDir, RelDir, RelFile
 
 
@@ -111,6 +113,8 @@ def test_diff_from_commit_changed_mode(local_git_repo: GitDir) -> None:
         local_git_repo / RelFile("file"),
         stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH,
     )
+    GitHelper.add(local_git_repo, RelFile("file"))
+    GitHelper.repo(local_git_repo).index.commit("Change mode")
     file = quick_mirror_file("file")
     diff = Diff.from_commit(initial_commit, local_git_repo, file)
     assert diff == Diff(
@@ -172,3 +176,58 @@ def test_diff_apply_versioned_file(
     diff.apply(local_git_repo)
     with open(local_git_repo / file.target) as f:
         assert f.read() == text_snapshot
+
+
+def test_diff_from_files_matches_individual_diffs(local_git_repo: GitDir) -> None:
+    initial_commit = add_commit(
+        local_git_repo,
+        {"unchanged": "same", "changed": "v1", "folder/nested": "v1", 'quote"d': "v1"},
+    )
+    second_commit = add_commit(
+        local_git_repo, {"unchanged": "same", "changed": "v2", "folder/nested": "v2", "new": "new"}
+    )
+    add_commit(
+        local_git_repo,
+        {"unchanged": "same", "changed": "v3", "folder/nested": "v2", "new": "newer"},
+    )
+    files = [
+        quick_versioned_mirror_file("changed", commit=initial_commit),
+        quick_versioned_mirror_file("unchanged", commit=initial_commit),
+        quick_versioned_mirror_file("folder/nested", "renamed", commit=initial_commit),
+        quick_versioned_mirror_file("changed", "other", commit=second_commit),
+        quick_versioned_mirror_file("new", commit=second_commit),
+        quick_versioned_mirror_file("new", "fresh"),
+        quick_versioned_mirror_file('quote"d', commit=initial_commit),
+    ]
+    assert Diff.from_files(local_git_repo, files) == [
+        Diff.from_file(local_git_repo, file) for file in files
+    ]
+
+
+def test_diff_from_files_constant_subprocesses(local_git_repo: GitDir) -> None:
+    filenames = [f"folder/file{i}" for i in range(50)]
+    initial_commit = add_commit(local_git_repo, dict.fromkeys(filenames, "v1"))
+    add_commit(local_git_repo, dict.fromkeys(filenames, "v2"))
+    files = [quick_versioned_mirror_file(file, commit=initial_commit) for file in filenames]
+    with mock.patch.object(GitHelper, "wait", wraps=GitHelper.wait) as wait:
+        diffs = Diff.from_files(local_git_repo, files)
+    assert wait.call_count <= 2
+    assert all("+v2" in diff.patch for diff in diffs)
+
+
+def test_diff_apply_all_single_patch(local_git_repo: GitDir) -> None:
+    source = tempfile.mkdtemp()
+    filenames = [f"folder/file{i}" for i in range(20)]
+    initial_commit = add_commit(source, dict.fromkeys(filenames, "v1"))
+    add_commit(source, dict.fromkeys(filenames, "v2"))
+    files = [quick_versioned_mirror_file(file, commit=initial_commit) for file in filenames]
+    files.append(quick_versioned_mirror_file("folder/file0", "new"))
+    diffs = Diff.from_files(GitDir(source), files)
+
+    add_commit(local_git_repo, dict.fromkeys(filenames, "v1"))
+    with mock.patch.object(GitHelper, "apply_patch", wraps=GitHelper.apply_patch) as apply_patch:
+        Diff.apply_all(diffs, local_git_repo)
+    assert apply_patch.call_count == 1
+    for filename in [*filenames, "new"]:
+        with open(local_git_repo / RelFile(filename)) as f:
+            assert f.read() == "v2"
@@ -1,11 +1,8 @@
-import contextlib
 from dataclasses import dataclass
 from typing import Self
 
-from git import Blob, Submodule, Tree
-
 from .config import MirrorFileConfig
-from .githelper import GitHelper
+from .githelper import GitHelper, ObjectType
 from .typed_path import GitDir, RelFile
 from .types import Commit
 
@@ -19,19 +16,17 @@ class MirrorFile:
     def from_config(cls, config: MirrorFileConfig) -> Self:
         return cls(source=config.source, target=config.target)
 
-    def _git_object(self, folder: GitDir) -> Blob | Tree | Submodule | None:
-        with contextlib.suppress(KeyError):
-            return GitHelper.tree(folder) / self.source
-        return None
+    def _object_type(self, folder: GitDir) -> ObjectType | None:
+        return GitHelper.object_type(folder, self.source)
 
     def exists_in(self, folder: GitDir) -> bool:
-        return self._git_object(folder) is not None
+        return self._object_type(folder) is not None
 
     def is_file_in(self, folder: GitDir) -> bool:
-        return isinstance(self._git_object(folder), Blob)
+        return self._object_type(folder) == "blob"
 
     def is_folder_in(self, folder: GitDir) -> bool:
-        return isinstance(self._git_object(folder), Tree)
+        return self._object_type(folder) == "tree"
 
 
 @dataclass(frozen=True)
@@ -43,10 +38,8 @@ class VersionedMirrorFile:
     def from_config(cls, config: MirrorFileConfig, commit: Commit | None) -> Self:
         return cls(MirrorFile.from_config(config), commit)
 
-    def _git_object(self, folder: GitDir) -> Blob | Tree | Submodule | None:
-        with contextlib.suppress(KeyError):
-            return GitHelper.tree(folder, self.commit) / self.source
-        return None
+    def _object_type(self, folder: GitDir) -> ObjectType | None:
+        return GitHelper.object_type(folder, self.source, self.commit)
 
     @property
     def source(self) -> RelFile:
@@ -66,4 +59,4 @@ class VersionedMirrorFile:
         return self.file.is_folder_in(folder)
 
     def existed_in(self, folder: GitDir) -> bool:
-        return isinstance(self._git_object(folder), Blob)
+        return self._object_type(folder) == "blob"
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+import os
+
+from loguru import logger
+
+from .logger import error_message
+from .syncer import MirrorSyncer
+from .typed_path import AbsDir, AbsFile, GitDir
+from .types import ExitCode
+from .utils import run_in_parallel
+
+
+@dataclass(frozen=True)
+class FleetResult:
+    target: AbsDir
+    error: BaseException | None
+
+    def log(self) -> None:
+        if self.error is None:
+            logger.info(f"{self.target.path}: synced.")
+        else:
+            logger.error(f"{self.target.path}: {error_message(self.error)}")
+
+
+@dataclass(frozen=True)
+class MirrorFleet:
+    """Sync many working repos in one process, so each source is only checked out once."""
+
+    targets: Sequence[AbsDir]
+
+    @classmethod
+    def from_manifest(cls, manifest: AbsFile) -> list[AbsDir]:
+        with open(manifest) as f:
+            lines = [line.strip() for line in f]
+        directory = os.path.dirname(manifest)
+        return [
+            AbsDir(os.path.join(directory, line))
+            for line in lines
+            if line and not line.startswith("#")
+        ]
+
+    def sync(self, *, jobs: int) -> ExitCode:
+        results = run_in_parallel(self._sync, self.targets, jobs=jobs)
+        for result in results:
+            result.log()
+        num_failures = sum(result.error is not None for result in results)
+        if num_failures:
+            logger.error(f"Failed to sync {num_failures} of {len(results)} repos.")
+            return 1
+        logger.success(f"All {len(results)} repos synced!")
+        return 0
+
+    @classmethod
+    def _sync(cls, target: AbsDir) -> FleetResult:
+        try:
+            MirrorSyncer(GitDir(target)).sync()
+        except Exception as e:  # noqa: BLE001
+            return FleetResult(target, e)
+        return FleetResult(target, None)
@@ -0,0 +1,45 @@
+import os
+import tempfile
+from unittest import mock
+
+from .constants import MIRROR_FILE, MIRROR_LOCK
+from .fleet import MirrorFleet
+from .githelper import GitHelper
+from .installer import MirrorInstaller
+from .test_utils import add_commit
+from .typed_path import AbsDir, AbsFile, GitDir, RelDir, RelFile
+
+
+def test_from_manifest(typed_tmp_path: AbsDir) -> None:
+    manifest = typed_tmp_path / RelFile("manifest")
+    with open(manifest, "w") as f:
+        f.write("service-a\n\n# comment\n  service-b  \n/absolute/service-c\n")
+    assert MirrorFleet.from_manifest(manifest) == [
+        typed_tmp_path / RelDir("service-a"),
+        typed_tmp_path / RelDir("service-b"),
+        AbsDir("/absolute/service-c"),
+    ]
+
+
+def test_fleet_sync_shares_sources(typed_tmp_path: AbsDir) -> None:
+    remote = tempfile.mkdtemp()
+    add_commit(remote, dict(file="v0"))
+    config = f"repos:\n  - source: {remote}\n    files:\n      - file\n"
+    targets = [typed_tmp_path / RelDir(f"target{i}") for i in range(9)]
+    for target in targets[:-1]:
+        add_commit(target, {os.fspath(MIRROR_FILE): config})
+        MirrorInstaller(target=GitDir(target), source=target / MIRROR_FILE).install()
+    targets[-1].path.mkdir()
+
+    for round in range(1, 3):
+        contents = f"v{round}"
+        add_commit(remote, dict(file=contents))
+        GitHelper.checkout.cache_clear()
+        with mock.patch.object(GitHelper, "_checkout", wraps=GitHelper._checkout) as checkout:
+            exitcode = MirrorFleet(targets).sync(jobs=len(targets))
+        assert exitcode == 1
+        assert checkout.call_count == 1
+        for target in targets[:-1]:
+            with open(AbsFile(target / RelFile("file"))) as f:
+                assert f.read() == contents
+        assert not (targets[-1] / MIRROR_LOCK).exists()
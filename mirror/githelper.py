@@ -1,24 +1,42 @@
-from collections.abc import Mapping, Sequence
+from collections.abc import Generator, Iterator, Mapping, Sequence
+import contextlib
 from dataclasses import dataclass
+import fcntl
 import functools
+import hashlib
+import json
 import os
 from os import PathLike
 import shutil
-from subprocess import PIPE, Popen
+from subprocess import DEVNULL, PIPE, Popen
+import threading
+import time
 import traceback
-from typing import Any, cast
+from typing import IO, Any, ClassVar, Literal, Self, cast
 
 import git
 from git import HEAD, GitCommandError, GitError, Head, InvalidGitRepositoryError, Tree
 from git import Repo as GitRepo
 from loguru import logger
 
-from .constants import MIRROR_MONITOR_EXTENSION, MIRROR_SEMAPHORE_EXTENSION
+from .constants import (
+    MIRROR_ACCESS_EXTENSION,
+    MIRROR_CACHE,
+    MIRROR_CLONE_DEPTH,
+    MIRROR_CLONE_FILTER,
+    MIRROR_FETCH_EXTENSION,
+    MIRROR_MONITOR_EXTENSION,
+    MIRROR_OBJECT_STORE,
+    MIRROR_OBJECT_STORE_LOCK,
+    MIRROR_SEMAPHORE_EXTENSION,
+    MIRROR_TREE_INDEX,
+    MIRROR_TREE_INDEX_LIMIT,
+)
 from .lock import FileSystemSemaphore
-from .logger import describe
-from .typed_path import AbsDir, GitDir, RelFile, Remote
+from .logger import ProgramState, describe
+from .typed_path import AbsDir, GitDir, RelDir, RelFile, Remote
 from .types import Commit
-from .utils import strict_not_none
+from .utils import strict_cast, strict_not_none, synchronized_cache, write_atomically
 
 
 @dataclass(frozen=True, slots=True, kw_only=True)
@@ -29,21 +47,191 @@ class ProcessResult:
     args: Sequence[str]
 
     def log(self, level: str) -> None:
-        logger.log(level, f"Running: {self.args}")
-        logger.log(level, f"stdout:\n{self.stdout}")
-        logger.log(level, f"stderr:\n{self.stderr}")
-        logger.log(level, f"returncode = {self.returncode}")
+        lazy_logger = logger.opt(lazy=True)
+        lazy_logger.log(level, "Running: {}", lambda: self.args)
+        lazy_logger.log(level, "stdout:\n{}", lambda: self.stdout)
+        lazy_logger.log(level, "stderr:\n{}", lambda: self.stderr)
+        lazy_logger.log(level, "returncode = {}", lambda: self.returncode)
+
+
+type ObjectType = Literal["blob", "tree", "commit", "tag"]
+# Like `GitHelper.blob_oid`, this assumes SHA-1 object names.
+EMPTY_TREE_OID = hashlib.sha1(b"tree 0\0", usedforsecurity=False).hexdigest()
+EXECUTABLE_FILE_MODE = "100755"
+# Git commands to run (in the directory given first), each receiving the command's result.
+type GitSteps[T] = Generator[tuple[AbsDir, *tuple[str, ...]], ProcessResult, T]
+
+
+@dataclass(frozen=True, slots=True)
+class ObjectInfo:
+    oid: str
+    type: ObjectType
+    size: int
+
+
+@dataclass(frozen=True, slots=True)
+class TreeEntry:
+    mode: str
+    type: ObjectType
+    oid: str
+
+
+@dataclass(frozen=True)
+class TreeIndex:
+    """Every path in the tree of `commit`, from one recursive listing."""
+
+    commit: Commit
+    entries: Mapping[RelFile, TreeEntry]
+
+    def object_type(self, file: RelFile) -> ObjectType | None:
+        entry = self.entries.get(file)
+        return None if entry is None else entry.type
+
+    def executable(self, file: RelFile) -> bool:
+        return self.entries[file].mode == EXECUTABLE_FILE_MODE
+
+    def dumps(self) -> bytes:
+        entries = [
+            [os.fspath(file), entry.mode, entry.type, entry.oid]
+            for file, entry in self.entries.items()
+        ]
+        return json.dumps(dict(commit=self.commit.sha, entries=entries)).encode("utf-8")
+
+    @classmethod
+    def loads(cls, data: bytes) -> Self:
+        index = json.loads(data)
+        return cls(
+            Commit(index["commit"]),
+            {
+                RelFile(file): TreeEntry(mode, strict_cast(ObjectType, object_type), oid)
+                for file, mode, object_type, oid in index["entries"]
+            },
+        )
+
+
+@dataclass
+class CatFile:
+    """Long-running `git cat-file`, restarted whenever its replies cannot be trusted."""
+
+    local: GitDir
+    env: Mapping[str, Any]
+    process: Popen[bytes]
+    lock: threading.Lock
+    MIN_GIT_VERSION: ClassVar[tuple[int, ...]] = (2, 36)  # for `--batch-command`
+
+    def __del__(self) -> None:
+        self.close()
+
+    @classmethod
+    def start(cls, local: GitDir, *, env: Mapping[str, Any]) -> Self:
+        return cls(local, env, cls._popen(local, env), threading.Lock())
+
+    @classmethod
+    def _popen(cls, local: GitDir, env: Mapping[str, Any]) -> Popen[bytes]:
+        if GitHelper.version() < cls.MIN_GIT_VERSION:
+            raise GitError(
+                f"git {'.'.join(map(str, cls.MIN_GIT_VERSION))} or newer is required "
+                f"(found {'.'.join(map(str, GitHelper.version()))})."
+            )
+        return Popen(
+            ["git", "cat-file", "--batch-command", "--buffer"],
+            cwd=local,
+            env=env,
+            stdin=PIPE,
+            stdout=PIPE,
+            stderr=DEVNULL,
+        )
+
+    def info(self, revs: Sequence[str]) -> list[ObjectInfo | None]:
+        with self.lock, self._restart_on_error():
+            self._request("info", revs)
+            return [self._read_header() for _ in revs]
+
+    def contents(self, revs: Sequence[str]) -> list[bytes | None]:
+        with self.lock, self._restart_on_error():
+            self._request("contents", revs)
+            return [self._read_contents() for _ in revs]
+
+    @contextlib.contextmanager
+    def _restart_on_error(self) -> Iterator[None]:
+        try:
+            yield
+        except (GitCommandError, OSError) as e:
+            # Unread replies would otherwise be taken as answers to the next request.
+            args = cast(list[str], self.process.args)
+            self.close()
+            self.process = self._popen(self.local, self.env)
+            if isinstance(e, OSError):
+                raise GitCommandError(args, stderr=str(e)) from e
+            raise
+
+    def _request(self, command: str, revs: Sequence[str]) -> None:
+        for rev in revs:
+            if "\n" in rev:
+                raise ValueError(f"Unable to look up {rev!r}.")
+        request = "".join(f"{command} {rev}\n" for rev in revs) + "flush\n"
+        self.stdin.write(request.encode("utf-8"))
+        self.stdin.flush()
+
+    def _read_header(self) -> ObjectInfo | None:
+        header = self.stdout.readline()
+        if not header:
+            raise GitCommandError(cast(list[str], self.process.args), status=self.process.poll())
+        # Missing objects are echoed back, so may contain spaces.
+        header_text = header.decode("utf-8").removesuffix("\n")
+        if header_text.endswith((" missing", " ambiguous")):
+            return None
+        match header_text.rsplit(" ", 2):
+            case [oid, "blob" | "tree" | "commit" | "tag" as type_, size] if size.isdigit():
+                return ObjectInfo(oid, cast(ObjectType, type_), int(size))
+        raise GitCommandError(
+            cast(list[str], self.process.args), stderr=f"Unexpected reply {header_text!r}."
+        )
+
+    def _read_contents(self) -> bytes | None:
+        info = self._read_header()
+        if info is None:
+            return None
+        contents = self.stdout.read(info.size)
+        self.stdout.read(1)
+        return contents
+
+    @property
+    def stdin(self) -> IO[bytes]:
+        return strict_not_none(self.process.stdin)
+
+    @property
+    def stdout(self) -> IO[bytes]:
+        return strict_not_none(self.process.stdout)
+
+    def close(self) -> None:
+        with contextlib.suppress(OSError):
+            self.stdin.close()
+        if self.process.poll() is None:
+            # Replies may still be waiting to be read, so do not wait for them to be written.
+            self.process.kill()
+            self.process.wait()
+        self.stdout.close()
 
 
 class GitHelper:
     @classmethod
-    @functools.cache
+    @synchronized_cache
     def repo(cls, local: GitDir) -> GitRepo:
         return GitRepo(local)
 
+    @classmethod
+    def forget(cls, local: GitDir) -> None:
+        """Drop the cached repo and reader for `local`, as they go stale if it is replaced."""
+        if (repo := cls.repo.cache_discard(cls, local)) is not None:
+            repo.close()
+        if (cat_file := cls.cat_file.cache_discard(cls, local)) is not None:
+            cat_file.close()
+        cls._head_tree_index.cache_discard(cls, local)
+
     @classmethod
     def run_command(
-        cls, local: GitDir, command: str, *args: str | PathLike, stdin: str | bytes | None = None
+        cls, local: AbsDir, command: str, *args: str | PathLike, stdin: str | bytes | None = None
     ) -> ProcessResult:
         env = cls._filter_environment()
         process = Popen(
@@ -55,36 +243,34 @@ class GitHelper:
             text=False,
             stdin=None if stdin is None else PIPE,
         )
-        cls.pipe_stdin(process, stdin)
-        return cls.wait(process)
+        return cls.wait(process, stdin)
 
     @classmethod
     @functools.cache
-    def _filter_environment(cls) -> Mapping[str, Any]:
-        return {key: value for key, value in os.environ.items() if not key.startswith("GIT_")}
+    def version(cls) -> tuple[int, ...]:
+        return git.Git().version_info
 
     @classmethod
-    def pipe_stdin(cls, process: Popen[bytes], stdin: str | bytes | None) -> None:
-        if stdin is not None:
-            cls._pipe_stdin(process, stdin)
+    @functools.cache
+    def _filter_environment(cls) -> Mapping[str, Any]:
+        return {key: value for key, value in os.environ.items() if not key.startswith("GIT_")}
 
     @classmethod
-    def _pipe_stdin(cls, process: Popen[bytes], stdin: str | bytes) -> None:
-        assert process.stdin is not None
+    def wait(cls, process: Popen[bytes], stdin: str | bytes | None = None) -> ProcessResult:
         if isinstance(stdin, str):
             stdin = stdin.encode("utf-8")
-        process.stdin.write(stdin)
-        process.stdin.close()
-
-    @classmethod
-    def wait(cls, process: Popen) -> ProcessResult:
-        process.wait()
+        # Read the output while writing the input, as git blocks once a pipe is full.
+        stdout, stderr = process.communicate(stdin)
         result = ProcessResult(
-            stdout=strict_not_none(git.safe_decode(strict_not_none(process.stdout).read())),
-            stderr=strict_not_none(git.safe_decode(strict_not_none(process.stderr).read())),
+            stdout=strict_not_none(git.safe_decode(stdout)),
+            stderr=strict_not_none(git.safe_decode(stderr)),
             returncode=process.returncode,
             args=tuple(cast(Sequence[str], process.args)),
         )
+        return cls.check_result(result)
+
+    @classmethod
+    def check_result(cls, result: ProcessResult) -> ProcessResult:
         if result.returncode in (0, 1):
             result.log(level="TRACE")
         else:
@@ -98,28 +284,94 @@ class GitHelper:
         return result
 
     @classmethod
-    @functools.cache
+    @synchronized_cache
     def checkout(cls, remote: Remote, local: GitDir) -> FileSystemSemaphore:
+        local.path.parent.mkdir(parents=True, exist_ok=True)
         semaphore = FileSystemSemaphore.acquire(local + MIRROR_SEMAPHORE_EXTENSION)
-        if semaphore.leader:
-            cls._checkout(remote, local)
-        semaphore.synchronize(local + MIRROR_MONITOR_EXTENSION)
+        with semaphore.release_on_error():
+            (local + MIRROR_ACCESS_EXTENSION).path.touch()
+            if semaphore.leader:
+                with cls._connection(remote):
+                    cls._checkout(remote, local)
+            semaphore.synchronize(local + MIRROR_MONITOR_EXTENSION)
         # semaphore is cached to prevent destruction until exit
         return semaphore
 
+    @classmethod
+    @contextlib.contextmanager
+    def _connection(cls, remote: Remote) -> Iterator[None]:
+        host = remote.host
+        if host is None:
+            yield
+            return
+        with cls._host_semaphore(host, ProgramState.jobs_per_host):
+            yield
+
+    @classmethod
+    @synchronized_cache
+    def _host_semaphore(cls, host: str, jobs: int) -> threading.BoundedSemaphore:
+        return threading.BoundedSemaphore(jobs)
+
     @classmethod
     def _checkout(cls, remote: Remote, local: GitDir) -> None:
+        if cls._recently_fetched(local):
+            logger.trace(f"Reusing {remote} in {local}")
+            return
+        cls._fetch_checkout(remote, local)
+        cls._share_objects(local)
+        (local + MIRROR_FETCH_EXTENSION).path.touch()
+
+    @classmethod
+    def _recently_fetched(cls, local: GitDir) -> bool:
+        if ProgramState.cache_ttl <= 0:
+            return False
+        try:
+            fetched_time = os.path.getmtime(local + MIRROR_FETCH_EXTENSION)
+        except OSError:
+            return False
+        return time.time() - fetched_time < ProgramState.cache_ttl and local.is_folder()
+
+    @classmethod
+    def run_steps[T](cls, steps: GitSteps[T]) -> T:
+        """Run each command from `steps`, sending back its result (or throwing its error)."""
+        try:
+            step = next(steps)
+            while True:
+                try:
+                    result = cls.run_command(*step)
+                except Exception as e:  # noqa: BLE001
+                    step = steps.throw(e)
+                else:
+                    step = steps.send(result)
+        except StopIteration as e:
+            return e.value
+
+    @classmethod
+    def _fetch_checkout(cls, remote: Remote, local: GitDir) -> None:
+        cls.run_steps(cls._fetch_checkout_steps(remote, local))
+
+    @classmethod
+    def _fetch_checkout_steps(cls, remote: Remote, local: GitDir) -> GitSteps[None]:
         try:
-            cls._clone(remote, local)
+            yield from cls._clone_or_sync_steps(remote, local)
+        finally:
+            # HEAD may have moved.
+            cls._head_tree_index.cache_discard(cls, local)
+
+    @classmethod
+    def _clone_or_sync_steps(cls, remote: Remote, local: GitDir) -> GitSteps[None]:
+        try:
+            yield from cls._clone_steps(remote, local)
         except GitCommandError as e:
             logger.debug(e)
             try:
                 try:
-                    cls._sync(local)
+                    yield from cls._sync_steps(local)
                 except InvalidGitRepositoryError as e:
                     logger.debug(e)
                     shutil.rmtree(local, ignore_errors=True)
-                    cls._clone(remote, local)
+                    cls.forget(local)
+                    yield from cls._clone_steps(remote, local)
             except Exception as e:  # noqa: BLE001
                 traceback.print_exc()
                 logger.debug(e)
@@ -127,36 +379,317 @@ class GitHelper:
 
     @classmethod
     def _clone(cls, remote: Remote, local: AbsDir) -> None:
-        with describe(f"Cloning {remote} into {local}", error_level="DEBUG"):
-            GitRepo.clone_from(remote.canonical, os.fspath(local))
+        cls.run_steps(cls._clone_steps(remote, local))
 
     @classmethod
-    def _sync(cls, local: GitDir) -> None:
-        with describe(f"Pulling {cls.repo(local).remote().url} into {local}", error_level="DEBUG"):
-            commit = cls._fetch(local)
-            cls.run_command(local, "reset", "--hard", commit.sha)
+    def _clone_steps(cls, remote: Remote, local: AbsDir) -> GitSteps[None]:
+        # Only the default branch is read, and only from the object database,
+        # so skip the working tree, other branches and tags.
+        command = [
+            "clone",
+            "--no-checkout",
+            "--single-branch",
+            "--no-tags",
+            f"--reference-if-able={os.fspath(cls._object_store())}",
+        ]
+        if MIRROR_CLONE_FILTER is not None:
+            command.append(f"--filter={MIRROR_CLONE_FILTER}")
+        if MIRROR_CLONE_DEPTH is not None:
+            command.append(f"--depth={MIRROR_CLONE_DEPTH}")
+        command.extend(["--", remote.canonical, os.fspath(local)])
+        with (
+            describe("Cloning {} into {}", remote, local, error_level="DEBUG"),
+            cls.lock_object_store(cls._object_store(), fcntl.LOCK_SH),
+        ):
+            yield AbsDir(os.path.dirname(local)), *command
 
     @classmethod
-    def _fetch(cls, local: GitDir) -> Commit:
-        cls.repo(local).remote().fetch()
+    @synchronized_cache
+    def _object_store(cls) -> AbsDir:
+        # The store has no refs and relies on the caches to keep objects alive (see `prune_objects`).
+        store = MIRROR_CACHE / MIRROR_OBJECT_STORE
+        store.path.mkdir(parents=True, exist_ok=True)
+        GitRepo.init(store, bare=True)
+        return store
+
+    @classmethod
+    def _share_objects(cls, local: GitDir) -> None:
+        """Move objects that are not in the object store into it."""
+        shared_objects = os.fspath(cls._object_store() / RelDir("objects"))
+        objects = local / RelDir(".git/objects")
+        alternates = objects / RelFile("info/alternates")
+        if (
+            not alternates.exists()
+            or shared_objects not in alternates.path.read_text().splitlines()
+        ):
+            with open(alternates, "a") as f:
+                f.write(f"{shared_objects}\n")
+        with (
+            describe("Sharing objects from {}", local, error_level="DEBUG"),
+            cls.lock_object_store(cls._object_store(), fcntl.LOCK_SH),
+        ):
+            # Pack only objects missing from the store, then hand the packs over.
+            cls.run_command(local, "repack", "-a", "-d", "-l", "-q")
+            for index in (objects / RelDir("pack")).path.glob("*.idx"):
+                # Move the index last so the store never sees an incomplete pack.
+                files = sorted(index.parent.glob(f"{index.stem}.*"), key=lambda file: file == index)
+                if cls._num_packed_objects(index) == 0:
+                    # Clones that borrow every object still write an empty (promisor) pack.
+                    for file in reversed(files):
+                        os.remove(file)
+                    continue
+                for file in files:
+                    os.replace(file, os.path.join(shared_objects, "pack", file.name))
+
+    @classmethod
+    def _num_packed_objects(cls, index: PathLike) -> int:
+        with open(index, "rb") as f:
+            # The last entry of the (version 2) fan-out table counts every object.
+            f.seek(8 + 255 * 4)
+            return int.from_bytes(f.read(4), "big")
+
+    @classmethod
+    @contextlib.contextmanager
+    def lock_object_store(cls, store: AbsDir, operation: int) -> Iterator[None]:
+        """Hold the store's lock, shared while borrowing objects and exclusive while pruning."""
+        with open(store / MIRROR_OBJECT_STORE_LOCK, "a") as lock:
+            fcntl.flock(lock, operation)
+            yield
+
+    @classmethod
+    def reachable_objects(cls, local: GitDir) -> set[str]:
+        result = cls.run_command(
+            local,
+            "rev-list",
+            "--objects",
+            "--all",
+            "--reflog",
+            "--indexed-objects",
+            "--missing=allow-any",
+            "HEAD",
+        )
+        return {line.split(" ", 1)[0] for line in result.stdout.splitlines()}
+
+    @classmethod
+    def prune_objects(cls, store: AbsDir, keep: set[str]) -> None:
+        """Repack the store with only the objects in `keep`, removing its other packs."""
+        pack_directory = store / RelDir("objects/pack")
+        packs = list(pack_directory.path.glob("*.pack"))
+        local = GitDir(store, check=False)
+        stored = cls.run_command(
+            local, "cat-file", "--batch-all-objects", "--batch-check=%(objectname)"
+        )
+        objects = keep.intersection(stored.stdout.splitlines())
+        if objects:
+            result = cls.run_command(
+                local,
+                "pack-objects",
+                "-q",
+                os.fspath(pack_directory / RelFile("pack")),
+                stdin="".join(f"{oid}\n" for oid in sorted(objects)),
+            )
+            new_pack = f"pack-{result.stdout.strip()}"
+            if any(pack.with_suffix(".promisor").exists() for pack in packs):
+                # Blobs missing from the clones can still be fetched from their remotes.
+                (pack_directory / RelFile(f"{new_pack}.promisor")).path.touch()
+            # The new pack has the same name as an old one with exactly the same objects.
+            packs = [pack for pack in packs if pack.stem != new_pack]
+        for pack in packs:
+            # Remove the index first so the store never sees an incomplete pack.
+            for file in sorted(
+                pack.parent.glob(f"{pack.stem}.*"), key=lambda file: file.suffix != ".idx"
+            ):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(file)
+
+    @classmethod
+    def _sync(cls, local: GitDir) -> Commit:
+        return cls.run_steps(cls._sync_steps(local))
+
+    @classmethod
+    def _sync_steps(cls, local: GitDir) -> GitSteps[Commit]:
+        """Bring `local` up to date with its tracked branch, only fetching if it has changed."""
+        with describe(
+            "Pulling {} into {}", lambda: cls.repo(local).remote().url, local, error_level="DEBUG"
+        ):
+            commit = yield from cls._remote_commit(local)
+            if commit is None or commit.sha != cls.commit(local):
+                commit = yield from cls._fetch(local)
+            # Only the branch moves, as cache repos have no working tree.
+            yield local, "reset", "--soft", commit.sha
+        return commit  # noqa: B901
+
+    @classmethod
+    def _remote_commit(cls, local: GitDir) -> GitSteps[Commit | None]:
+        """Look up the tracked branch on the remote without fetching any objects."""
+        tracked_ref = cls._tracked_ref(local)
+        if tracked_ref is None:
+            return None
+        remote_name, ref = tracked_ref
+        advertisement = yield local, "ls-remote", remote_name, ref
+        return cls._advertised_commit(advertisement.stdout, ref)  # noqa: B901
+
+    @classmethod
+    def _tracked_ref(cls, local: GitDir) -> tuple[str, str] | None:
+        tracking_branch = cls.branch(local).tracking_branch()
+        if tracking_branch is None:
+            return None
+        return tracking_branch.remote_name, f"refs/heads/{tracking_branch.remote_head}"
+
+    @classmethod
+    def _advertised_commit(cls, advertisement: str, ref: str) -> Commit | None:
+        for line in advertisement.splitlines():
+            match line.split("\t"):
+                case [sha, name] if name == ref:
+                    return Commit(sha)
+        return None
+
+    @classmethod
+    def _fetch(cls, local: GitDir) -> GitSteps[Commit]:
+        depth = () if MIRROR_CLONE_DEPTH is None else (f"--depth={MIRROR_CLONE_DEPTH}",)
+        tracking_branch = strict_not_none(cls.branch(local).tracking_branch())
+        # Request only the tracked branch, even for caches cloned with every branch.
+        refspec = f"+refs/heads/{tracking_branch.remote_head}:{tracking_branch.path}"
+        yield local, "fetch", "--no-tags", *depth, tracking_branch.remote_name, refspec
+        return cls._tracking_commit(local)  # noqa: B901
+
+    @classmethod
+    def _tracking_commit(cls, local: GitDir) -> Commit:
         return Commit(strict_not_none(cls.branch(local).tracking_branch()).commit.hexsha)
 
     @classmethod
-    def fresh_diff(cls, local: GitDir, file: RelFile) -> str:
+    def ensure_commit(cls, local: GitDir, commit: Commit) -> None:
+        if cls.has_commit(local, commit):
+            return
+        with describe("Fetching {} into {}", commit, local, error_level="DEBUG"):
+            try:
+                cls._fetch_commit(local, commit)
+            except GitCommandError as e:
+                # Some servers refuse to send commits that are not at the tip of a ref.
+                logger.debug(e)
+                cls.run_command(local, "fetch", "--unshallow", "--no-tags", "origin")
+
+    @classmethod
+    def has_commit(cls, local: GitDir, commit: Commit) -> bool:
+        # `--missing` stops partial clones from fetching the commit during the check.
+        try:
+            cls.run_command(
+                local, "rev-list", "--no-walk", "--missing=allow-any", f"{commit.sha}^{{commit}}"
+            )
+        except GitCommandError:
+            return False
+        return True
+
+    @classmethod
+    def _fetch_commit(cls, local: GitDir, commit: Commit) -> None:
+        depth = () if MIRROR_CLONE_DEPTH is None else (f"--depth={MIRROR_CLONE_DEPTH}",)
+        cls.run_command(local, "fetch", "--no-tags", *depth, "origin", commit.sha)
+
+    @classmethod
+    def file_diff(cls, local: GitDir, commit: Commit | None, file: RelFile) -> str:
         return cls.run_command(
-            local, "diff", "--no-index", "--full-index", "--", os.devnull, os.fspath(file)
+            local, "diff", *cls._diff_range(commit), "--", os.fspath(file)
         ).stdout
 
     @classmethod
-    def file_diff(cls, local: GitDir, commit: Commit, file: RelFile) -> str:
-        return cls.run_command(
-            local, "diff", "--full-index", commit.sha, "--", os.fspath(file)
+    def file_diffs(
+        cls, local: GitDir, commit: Commit | None, files: Sequence[RelFile]
+    ) -> dict[RelFile, str]:
+        """Diff `files` between `commit` (or nothing) and HEAD, without a working tree."""
+        diff = cls.run_command(
+            local, "diff", *cls._diff_range(commit), "--", *(os.fspath(file) for file in files)
         ).stdout
+        headers = {f"diff --git a/{os.fspath(file)} b/{os.fspath(file)}\n": file for file in files}
+        patches = dict.fromkeys(files, "")
+        for patch in cls._split_diff(diff):
+            header, _, _ = patch.partition("\n")
+            file = headers.get(f"{header}\n")
+            if file is None:
+                # Unusual filenames are quoted by git, so diff them individually.
+                return {file: cls.file_diff(local, commit, file) for file in files}
+            patches[file] = patch
+        return patches
+
+    @classmethod
+    def _diff_range(cls, commit: Commit | None) -> tuple[str, ...]:
+        return "--full-index", EMPTY_TREE_OID if commit is None else commit.sha, "HEAD"
+
+    @classmethod
+    def _split_diff(cls, diff: str) -> list[str]:
+        patches: list[list[str]] = []
+        for line in diff.splitlines(keepends=True):
+            if line.startswith("diff --git ") or not patches:
+                patches.append([])
+            patches[-1].append(line)
+        return ["".join(patch) for patch in patches]
 
     @classmethod
     def file_blob(cls, local: GitDir, commit: Commit, file: RelFile) -> bytes:
-        blob = cls.tree(local, commit) / file
-        return blob.data_stream.read()
+        [blob] = cls.file_blobs(local, commit, [file])
+        return blob
+
+    @classmethod
+    def file_blobs(cls, local: GitDir, commit: Commit, files: Sequence[RelFile]) -> list[bytes]:
+        blobs = cls.cat_file(local).contents([cls._rev(commit, file) for file in files])
+        for file, blob in zip(files, blobs, strict=True):
+            if blob is None:
+                raise KeyError(os.fspath(file))
+        return cast(list[bytes], blobs)
+
+    @classmethod
+    def object_type(
+        cls, local: GitDir, file: RelFile, commit: Commit | None = None
+    ) -> ObjectType | None:
+        [object_type] = cls.object_types(local, [file], commit)
+        return object_type
+
+    @classmethod
+    def object_types(
+        cls, local: GitDir, files: Sequence[RelFile], commit: Commit | None = None
+    ) -> list[ObjectType | None]:
+        infos = cls.cat_file(local).info([cls._rev(commit, file) for file in files])
+        object_types = [None if info is None else info.type for info in infos]
+        missing = [
+            file
+            for file, object_type in zip(files, object_types, strict=True)
+            if object_type is None
+        ]
+        if missing:
+            # Submodules are reported as missing, so check the tree directly.
+            submodules = cls._submodules(local, missing, commit)
+            object_types = [
+                "commit" if file in submodules else object_type
+                for file, object_type in zip(files, object_types, strict=True)
+            ]
+        return object_types
+
+    @classmethod
+    def _submodules(
+        cls, local: GitDir, files: Sequence[RelFile], commit: Commit | None
+    ) -> set[RelFile]:
+        entries = cls.run_command(
+            local,
+            "ls-tree",
+            "-z",
+            "HEAD" if commit is None else commit.sha,
+            "--",
+            *(os.fspath(file) for file in files),
+        ).stdout
+        submodules = set()
+        for entry in entries.split("\0"):
+            info, _, path = entry.partition("\t")
+            if info.startswith("160000 "):
+                submodules.add(RelFile(path))
+        return submodules
+
+    @classmethod
+    def _rev(cls, commit: Commit | None, file: RelFile) -> str:
+        return f"{'HEAD' if commit is None else commit.sha}:{os.fspath(file)}"
+
+    @classmethod
+    @synchronized_cache
+    def cat_file(cls, local: GitDir) -> CatFile:
+        return CatFile.start(local, env=cls._filter_environment())
 
     @classmethod
     def add(cls, local: GitDir, *files: RelFile) -> None:
@@ -165,11 +698,37 @@ class GitHelper:
 
     @classmethod
     def apply_patch(cls, local: GitDir, patch: str) -> None:
-        cls.run_command(local, "apply", "--allow-empty", "-3", "-", stdin=patch)
+        result = cls.run_command(local, "apply", "--allow-empty", "-3", "-", stdin=patch)
+        # Conflicts also exit with 1, but are applied (with markers) rather than reported as errors.
+        if any(line.startswith("error:") for line in result.stderr.splitlines()):
+            raise GitCommandError(
+                tuple(result.args),
+                status=result.returncode,
+                stdout=result.stdout,
+                stderr=result.stderr,
+            )
 
     @classmethod
-    def hash_object(cls, local: GitDir, blob: bytes) -> None:
-        cls.run_command(local, "hash-object", "--stdin", "-w", stdin=blob)
+    def write_blobs(cls, local: GitDir, blobs: Sequence[bytes]) -> None:
+        blobs = list(dict.fromkeys(blobs))
+        # Check in one process, rather than keeping a reader running for every target.
+        oids = "".join(f"{cls.blob_oid(blob)}\n" for blob in blobs)
+        result = cls.run_command(local, "cat-file", "--batch-check=%(objectname)", stdin=oids)
+        missing = [
+            blob
+            for blob, line in zip(blobs, result.stdout.splitlines(), strict=True)
+            if line.endswith(" missing")
+        ]
+        if not missing:
+            return
+        # fast-import writes a single pack (or loose objects for small imports).
+        stream = b"".join(b"blob\ndata %d\n%b\n" % (len(blob), blob) for blob in missing)
+        cls.run_command(local, "fast-import", "--quiet", stdin=stream)
+
+    @classmethod
+    def blob_oid(cls, blob: bytes) -> str:
+        header = b"blob %d\0" % len(blob)
+        return hashlib.sha1(header + blob, usedforsecurity=False).hexdigest()
 
     @classmethod
     def head(cls, local: GitDir) -> HEAD:
@@ -181,7 +740,71 @@ class GitHelper:
 
     @classmethod
     def commit(cls, local: GitDir) -> str:
-        return cls.head(local).commit.hexsha
+        # GitPython's object reader is not thread-safe, so resolve HEAD through the locked reader.
+        [info] = cls.cat_file(local).info(["HEAD"])
+        if info is None:
+            raise ValueError(f"Reference at HEAD in {local} does not exist.")
+        return info.oid
+
+    @classmethod
+    def tree_index(cls, local: GitDir, commit: Commit | None = None) -> TreeIndex:
+        if commit is None:
+            return cls._head_tree_index(local)
+        return cls._tree_index(local, commit)
+
+    @classmethod
+    @synchronized_cache
+    def _head_tree_index(cls, local: GitDir) -> TreeIndex:
+        # Loaded separately from `_tree_index`, so only one index is held per repo as HEAD moves.
+        return cls._load_tree_index(local, Commit(cls.commit(local)))
+
+    @classmethod
+    @synchronized_cache
+    def _tree_index(cls, local: GitDir, commit: Commit) -> TreeIndex:
+        return cls._load_tree_index(local, commit)
+
+    @classmethod
+    def _load_tree_index(cls, local: GitDir, commit: Commit) -> TreeIndex:
+        # Commits are immutable, so their index is kept for later runs.
+        directory = AbsDir(os.fspath(cls.repo(local).git_dir)) / MIRROR_TREE_INDEX
+        file = directory / RelFile(f"{commit.sha}.json")
+        try:
+            with open(file, "rb") as f:
+                index = TreeIndex.loads(f.read())
+            os.utime(file)
+            return index
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.trace(e)
+        index = cls._list_tree(local, commit)
+        try:
+            write_atomically(file, index.dumps())
+            cls._prune_tree_indexes(directory)
+        except OSError as e:
+            logger.debug(e)
+        return index
+
+    @classmethod
+    def _list_tree(cls, local: GitDir, commit: Commit) -> TreeIndex:
+        entries = cls.run_command(local, "ls-tree", "-r", "-t", "-z", "--full-tree", commit.sha)
+        index = {}
+        for entry in entries.stdout.split("\0"):
+            if not entry:
+                continue
+            info, _, path = entry.partition("\t")
+            mode, object_type, oid = info.split(" ")
+            index[RelFile(path)] = TreeEntry(mode, strict_cast(ObjectType, object_type), oid)
+        return TreeIndex(commit, index)
+
+    @classmethod
+    def _prune_tree_indexes(cls, directory: AbsDir) -> None:
+        files = sorted(
+            (entry for entry in os.scandir(directory) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+        for entry in files[MIRROR_TREE_INDEX_LIMIT:]:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(entry.path)
 
     @classmethod
     def tree(cls, local: GitDir, commit: Commit | None = None) -> Tree:
@@ -1,18 +1,22 @@
 from __future__ import annotations
 
-from collections.abc import Generator
+from collections.abc import Callable, Generator
 from multiprocessing import Process, Queue
+import os
 from pathlib import Path
 import random
 import tempfile
 import time
+from unittest import mock
 
 import git
 import pytest
 
-from .githelper import GitHelper
+from .githelper import CatFile, GitHelper, ObjectInfo
+from .logger import ProgramState
 from .test_utils import add_commit
-from .typed_path import AbsDir, GitDir, RelFile, Remote
+from .typed_path import AbsDir, GitDir, RelDir, RelFile, Remote
+from .types import Commit
 
 
 def local_remote_clone_test_case() -> tuple[str, list[str]]:
@@ -43,7 +47,187 @@ def local_remote_clone_test_case() -> tuple[str, list[str]]:
 def test_clone_remote(remote: str, expected_files: list[str], typed_tmp_path: AbsDir) -> None:
     GitHelper._clone(Remote(remote), typed_tmp_path)
     for file in expected_files:
-        assert (typed_tmp_path / RelFile(file)).exists()
+        assert GitHelper.object_type(GitDir(typed_tmp_path), RelFile(file)) == "blob"
+        # Files are only read from the object database.
+        assert not (typed_tmp_path / RelFile(file)).exists()
+
+
+def test_clone_is_shallow(typed_tmp_path: AbsDir) -> None:
+    remote = tempfile.mkdtemp()
+    add_commit(remote, dict(file="v1"))
+    add_commit(remote, dict(file="v2"))
+    local = GitDir(typed_tmp_path, check=False)
+    GitHelper._clone(Remote(f"file://{remote}"), local)
+    assert GitHelper.repo(local).git.rev_parse("--is-shallow-repository") == "true"
+    assert len(list(GitHelper.repo(local).iter_commits())) == 1
+
+
+def test_ensure_commit_fetches_old_commit(typed_tmp_path: AbsDir) -> None:
+    remote = tempfile.mkdtemp()
+    old_commit = add_commit(remote, dict(file="v1"))
+    add_commit(remote, dict(file="v2"))
+    local = GitDir(typed_tmp_path, check=False)
+    GitHelper._clone(Remote(f"file://{remote}"), local)
+    assert not GitHelper.has_commit(local, old_commit)
+    GitHelper.ensure_commit(local, old_commit)
+    assert GitHelper.has_commit(local, old_commit)
+    assert GitHelper.file_blob(local, old_commit, RelFile("file")) == b"v1"
+
+
+def test_ensure_commit_missing_commit(local_git_repo: GitDir) -> None:
+    add_commit(local_git_repo, dict(file="file"))
+    with pytest.raises(git.GitCommandError):
+        GitHelper.ensure_commit(local_git_repo, Commit("0" * 40))
+
+
+def test_run_command_with_large_input_and_output(local_git_repo: GitDir) -> None:
+    # Larger than a pipe's buffer in both directions.
+    data = "line\n" * 100_000
+    result = GitHelper.run_command(local_git_repo, "hash-object", "--stdin", stdin=data)
+    assert result.stdout.strip() == GitHelper.blob_oid(data.encode())
+    result = GitHelper.run_command(local_git_repo, "stripspace", stdin=data)
+    assert result.stdout == data
+
+
+def test_cat_file_batches(local_git_repo: GitDir) -> None:
+    add_commit(local_git_repo, {"file": "contents", "folder/nested": "nested contents"})
+    cat_file = GitHelper.cat_file(local_git_repo)
+    infos = cat_file.info(["HEAD:file", "HEAD:folder", "HEAD:missing", "HEAD:folder/nested"])
+    assert [None if info is None else (info.type, info.size) for info in infos] == [
+        ("blob", 8),
+        ("tree", 34),
+        None,
+        ("blob", 15),
+    ]
+    assert cat_file.contents(["HEAD:folder/nested", "HEAD:missing", "HEAD:file"]) == [
+        b"nested contents",
+        None,
+        b"contents",
+    ]
+
+
+def test_cat_file_missing_path_with_spaces(local_git_repo: GitDir) -> None:
+    add_commit(local_git_repo, {"has space": "contents"})
+    cat_file = GitHelper.cat_file(local_git_repo)
+    assert cat_file.info(["HEAD:has space missing", "HEAD:has space"]) == [
+        None,
+        ObjectInfo(GitHelper.blob_oid(b"contents"), "blob", 8),
+    ]
+
+
+def test_cat_file_restarts_after_error(local_git_repo: GitDir) -> None:
+    add_commit(local_git_repo, {"file": "contents"})
+    cat_file = GitHelper.cat_file(local_git_repo)
+    cat_file.process.kill()
+    cat_file.process.wait()
+    with pytest.raises(git.GitCommandError):
+        cat_file.contents(["HEAD:file"])
+    assert cat_file.contents(["HEAD:file", "HEAD:missing"]) == [b"contents", None]
+
+
+@pytest.mark.parametrize("version, supported", [((2, 35, 8), False), ((2, 36), True)])
+def test_cat_file_requires_recent_git(
+    version: tuple[int, ...], supported: bool, local_git_repo: GitDir
+) -> None:
+    with mock.patch.object(GitHelper, "version", return_value=version):
+        if supported:
+            CatFile.start(local_git_repo, env=os.environ).close()
+        else:
+            with pytest.raises(git.GitError):
+                CatFile.start(local_git_repo, env=os.environ)
+
+
+def test_write_blobs_skips_existing(local_git_repo: GitDir) -> None:
+    add_commit(local_git_repo, {"file": "existing"})
+    blobs = [b"existing", b"new\nblob", b"", b"new\nblob"]
+    with mock.patch.object(GitHelper, "run_command", wraps=GitHelper.run_command) as run_command:
+        GitHelper.write_blobs(local_git_repo, blobs)
+        GitHelper.write_blobs(local_git_repo, blobs)
+    assert [call.args[1] for call in run_command.call_args_list] == [
+        "cat-file",
+        "fast-import",
+        "cat-file",
+    ]
+    # No reader is left running for the target.
+    assert GitHelper.cat_file.cache_discard(GitHelper, local_git_repo) is None
+    oids = [GitHelper.blob_oid(blob) for blob in blobs]
+    assert GitHelper.cat_file(local_git_repo).contents(oids) == blobs
+
+
+def test_object_types(local_git_repo: GitDir) -> None:
+    commit = add_commit(local_git_repo, {"file": "file", "folder/nested": "nested"})
+    GitHelper.run_command(
+        local_git_repo, "update-index", "--add", "--cacheinfo", f"160000,{commit.sha},submodule"
+    )
+    GitHelper.repo(local_git_repo).index.commit("Add submodule")
+    files = [RelFile(file) for file in ["file", "folder", "folder/nested", "submodule", "missing"]]
+    assert GitHelper.object_types(local_git_repo, files) == ["blob", "tree", "blob", "commit", None]
+    assert GitHelper.object_types(local_git_repo, files, commit) == [
+        "blob",
+        "tree",
+        "blob",
+        None,
+        None,
+    ]
+
+
+def test_tree_index(local_git_repo: GitDir) -> None:
+    commit = add_commit(local_git_repo, {"file": "file", "folder/nested": "nested"})
+    GitHelper.run_command(
+        local_git_repo, "update-index", "--add", "--cacheinfo", f"160000,{commit.sha},submodule"
+    )
+    head = Commit(GitHelper.repo(local_git_repo).index.commit("Add submodule").hexsha)
+    files = [RelFile(file) for file in ["file", "folder", "folder/nested", "submodule", "missing"]]
+    index = GitHelper.tree_index(local_git_repo)
+    assert index.commit == head
+    assert [index.object_type(file) for file in files] == GitHelper.object_types(
+        local_git_repo, files
+    )
+    assert GitHelper.tree_index(local_git_repo, commit).object_type(RelFile("submodule")) is None
+
+
+def test_tree_index_is_kept_on_disk(local_git_repo: GitDir) -> None:
+    commit = add_commit(local_git_repo, {"file": "file", "folder/nested": "nested"})
+    index = GitHelper.tree_index(local_git_repo, commit)
+    GitHelper._tree_index.cache_clear()
+    with mock.patch.object(GitHelper, "run_command") as run_command:
+        assert GitHelper.tree_index(local_git_repo, commit) == index
+    run_command.assert_not_called()
+
+
+def test_tree_index_follows_checkout() -> None:
+    remote = tempfile.mkdtemp()
+    local = GitDir(tempfile.mkdtemp(), check=False)
+    add_commit(remote, dict(file="v1"))
+    GitHelper._fetch_checkout(Remote(remote), local)
+    assert GitHelper.tree_index(local).object_type(RelFile("new")) is None
+    commit = add_commit(remote, dict(file="v2", new="new"))
+    GitHelper._fetch_checkout(Remote(remote), local)
+    index = GitHelper.tree_index(local)
+    assert index.commit == commit
+    assert index.object_type(RelFile("new")) == "blob"
+
+
+def test_checkout_fetches_only_tracked_branch(typed_tmp_path: AbsDir) -> None:
+    remote = tempfile.mkdtemp()
+    add_commit(remote, dict(file="v1"))
+    remote_repo = git.Repo(remote)
+    remote_repo.create_head("other")
+    remote_repo.create_tag("v1")
+    local = GitDir(typed_tmp_path / RelDir("local"), check=False)
+    GitHelper._fetch_checkout(Remote(f"file://{remote}"), local)
+
+    commit = add_commit(remote, dict(file="v2"))
+    remote_repo.create_head("newer")
+    remote_repo.create_tag("v2")
+    GitHelper._fetch_checkout(Remote(f"file://{remote}"), local)
+    assert GitHelper.commit(local) == commit.sha
+    refs = GitHelper.run_command(local, "for-each-ref", "--format=%(refname)").stdout.split()
+    assert sorted(refs) == [
+        f"refs/heads/{GitHelper.branch(local).name}",
+        "refs/remotes/origin/HEAD",
+        f"refs/remotes/origin/{GitHelper.branch(local).name}",
+    ]
 
 
 def update_already_up_to_date_repo_test_case() -> tuple[list[str], GitDir]:
@@ -104,7 +288,27 @@ def update_repository_with_dirty_workdir_test_case() -> tuple[list[str], GitDir]
 def test_sync(expected_files: list[str], folder: GitDir) -> None:
     GitHelper._sync(folder)
     for file in expected_files:
-        assert (folder / RelFile(file)).exists()
+        assert GitHelper.object_type(folder, RelFile(file)) == "blob"
+
+
+@pytest.mark.parametrize(
+    "setup, fetched",
+    [
+        (update_already_up_to_date_repo_test_case, False),
+        (update_repository_with_dirty_workdir_test_case, False),
+        (update_repository_linearly_behind_test_case, True),
+        (update_repository_out_of_sync_test_case, True),
+    ],
+)
+def test_sync_only_fetches_when_remote_changed(
+    setup: Callable[[], tuple[list[str], GitDir]], fetched: bool
+) -> None:
+    expected_files, folder = setup()
+    with mock.patch.object(GitHelper, "_fetch", wraps=GitHelper._fetch) as fetch:
+        GitHelper._sync(folder)
+    assert fetch.called == fetched
+    for file in expected_files:
+        assert GitHelper.object_type(folder, RelFile(file)) == "blob"
 
 
 def commit_repeatedly(remote: GitDir) -> None:
@@ -119,8 +323,7 @@ def write_commit_to_queue(remote: Remote, local: GitDir, queue: Queue[str]) -> N
     # Can clear cache because the lock is saved locally in test body.
     GitHelper.checkout.cache_clear()
     GitHelper.checkout(remote, local)
-    with open(local / RelFile("file")) as f:
-        print(f"follower value = {f.read()}")
+    print(f"follower value = {GitHelper.repo(local).git.show('HEAD:file')}")
     queue.put(GitHelper.commit(local))
 
 
@@ -145,11 +348,53 @@ def test_checkout_race_condition(
     lock = GitHelper.checkout(updating_remote, local)
     assert lock.leader
     commit = GitHelper.commit(local)
-    with open(local / RelFile("file")) as f:
-        print(f"leader value = {f.read()}")
+    print(f"leader value = {GitHelper.repo(local).git.show('HEAD:file')}")
     time.sleep(random.random())
     queue: Queue[str] = Queue()
     follower = Process(target=write_commit_to_queue, args=(updating_remote, local, queue))
     follower.start()
     follower.join(1.0)
     assert queue.get_nowait() == commit
+
+
+@pytest.mark.parametrize("cache_ttl, refetched", [(0.0, True), (60.0, False)])
+def test_checkout_reuses_recently_fetched_cache(
+    cache_ttl: float, refetched: bool, typed_tmp_path: AbsDir
+) -> None:
+    remote = Remote(tempfile.mkdtemp())
+    add_commit(AbsDir(remote.repo), dict(file="file"))
+    local = GitDir(typed_tmp_path / RelDir("local"), check=False)
+    with mock.patch.object(ProgramState, "cache_ttl", cache_ttl):
+        GitHelper._checkout(remote, local)
+        with mock.patch.object(
+            GitHelper, "_fetch_checkout", wraps=GitHelper._fetch_checkout
+        ) as fetch_checkout:
+            GitHelper._checkout(remote, local)
+    assert fetch_checkout.called == refetched
+    assert GitHelper.object_type(local, RelFile("file")) == "blob"
+
+
+def test_checkout_shares_objects_between_forks(
+    typed_tmp_path: AbsDir, isolated_cache: AbsDir
+) -> None:
+    remote = tempfile.mkdtemp()
+    add_commit(remote, {f"file{i}": f"contents {i}" for i in range(10)})
+    fork = tempfile.mkdtemp()
+    git.Repo(remote).clone(fork)
+    locals_ = [GitDir(typed_tmp_path / RelDir(name), check=False) for name in ("remote", "fork")]
+    store_packs = GitHelper._object_store() / RelDir("objects/pack")
+    assert store_packs.path.is_relative_to(isolated_cache.path)
+    num_packs = []
+    for source, local in zip((remote, fork), locals_, strict=True):
+        GitHelper._checkout(Remote(f"file://{source}"), local)
+        num_packs.append(len(list(store_packs.path.glob("*.pack"))))
+    # The fork shares all of its objects, so adds no pack.
+    assert num_packs[0] == num_packs[1]
+    for local in locals_:
+        objects = local / RelDir(".git/objects")
+        assert not list((objects / RelDir("pack")).path.glob("*.pack"))
+        assert GitHelper.file_blob(local, Commit(GitHelper.commit(local)), RelFile("file3")) == (
+            b"contents 3"
+        )
+        with open(objects / RelFile("info/alternates")) as f:
+            assert len(f.read().splitlines()) == 1
@@ -16,7 +16,7 @@ from .manager import MirrorManager
 from .mirror import Mirror
 from .repo import MirrorRepo
 from .typed_path import AbsFile, RelFile, Remote
-from .utils import strict_cast
+from .utils import set_executable, strict_cast
 
 type InstallSource = AbsFile | RelFile | tuple[Remote, RelFile]
 
@@ -47,7 +47,9 @@ class MirrorInstaller(MirrorManager):
         else:
             with describe("Fetching config"):
                 [file] = self.source_repo.files
-            config = Parser.parse_file(self.source_repo.cache / file.source)
+            config = Parser.parse_contents(
+                file.source, self.source_repo.contents(file.source).decode("utf-8")
+            )
         return config
 
     @property
@@ -80,24 +82,25 @@ class MirrorInstaller(MirrorManager):
                 return cast(RelFile, path)
         return cast(RelFile | AbsFile, self.source)
 
-    @property
-    def mirror_source(self) -> RelFile | AbsFile:
-        return (
-            self.source_path
-            if self.source_repo is None
-            else self.source_repo.cache / strict_cast(RelFile, self.source_path)
-        )
-
     def copy_mirror_file(self) -> None:
         mirror_target = self.target / MIRROR_FILE
         mirror_file_existed = (mirror_target).exists()
         with contextlib.suppress(shutil.SameFileError):
-            shutil.copy2(self.mirror_source, self.target / MIRROR_FILE)
+            if self.source_repo is None:
+                shutil.copy2(self.source_path, mirror_target)
+            else:
+                with open(mirror_target, "wb") as f:
+                    f.write(self.source_repo.contents(strict_cast(RelFile, self.source_path)))
             if mirror_file_existed:
                 logger.warning(f"{MIRROR_FILE} has been overwritten during installation.")
 
     def _update_all(self) -> None:
         self.copy_mirror_file()
-        if self.source_repo is not None:
-            self.source_repo.update(self.target)
+        if (source_repo := self.source_repo) is not None:
+            source_repo.update(self.target)
+            # The cache has no working tree to copy the mode from, so take it from the tree.
+            set_executable(
+                self.target / MIRROR_FILE,
+                source_repo.executable(strict_cast(RelFile, self.source_path)),
+            )
         super()._update_all()
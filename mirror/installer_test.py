@@ -1,3 +1,5 @@
+import os
+import tempfile
 from unittest import mock
 
 from inline_snapshot._external._external_file import ExternalFile
@@ -5,7 +7,7 @@ import pytest
 
 from .constants import MIRROR_FILE
 from .repo import MirrorRepo
-from .test_utils import quick_installer, quick_mirror_repo, setup_repo, snapshot_of_repo
+from .test_utils import add_commit, quick_installer, quick_mirror_repo, setup_repo, snapshot_of_repo
 from .typed_path import AbsDir, GitDir, RelDir, RelFile
 
 
@@ -68,3 +70,36 @@ def test_installer_install(
         object.__setattr__(installer, "source", local_git_repo / installer.source)
     installer.install()
     assert snapshot_of_repo(local_git_repo, include_lockfile=False) == json_snapshot
+
+
+def test_installer_install_from_local_remote(local_git_repo: GitDir) -> None:
+    source = tempfile.mkdtemp()
+    add_commit(source, dict(file="contents"))
+    config_repo = tempfile.mkdtemp()
+    config = f"repos:\n  - source: {source}\n    files:\n      - file\n"
+    add_commit(config_repo, {"config.yaml": config})
+    add_commit(local_git_repo)
+
+    quick_installer(local_git_repo, (config_repo, "config.yaml")).install()
+    with open(local_git_repo / MIRROR_FILE) as f:
+        assert f.read() == config
+    with open(local_git_repo / RelFile("file")) as f:
+        assert f.read() == "contents"
+
+
+@pytest.mark.parametrize("executable", [False, True])
+def test_installer_install_from_local_remote_keeps_mode(
+    executable: bool, local_git_repo: GitDir
+) -> None:
+    source = tempfile.mkdtemp()
+    add_commit(source, dict(file="contents"))
+    config_repo = tempfile.mkdtemp()
+    config = f"repos:\n  - source: {source}\n    files:\n      - file\n"
+    with open(os.path.join(config_repo, "config.yaml"), "w") as f:
+        f.write(config)
+    os.chmod(os.path.join(config_repo, "config.yaml"), 0o755 if executable else 0o644)
+    add_commit(config_repo)
+    add_commit(local_git_repo)
+
+    quick_installer(local_git_repo, (config_repo, "config.yaml")).install()
+    assert os.access(local_git_repo / MIRROR_FILE, os.X_OK) == executable
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+from concurrent.futures import Future
 import contextlib
 from dataclasses import dataclass
 import errno
 import fcntl
+import io
+import os
+import threading
 import time
-from typing import ClassVar, Self
+from typing import Self
 
 from .constants import MIRROR_NAME
+from .logger import ProgramState
 from .state import ReadableState, WriteableState
 from .typed_path import AbsFile
 from .types import PyFile
+from .utils import strict_not_none
 
 
 @dataclass(frozen=True)
@@ -69,16 +76,23 @@ class FileSystemLock:
     def release(self) -> None:
         self.file.close()
 
-    def unlock(self, state: WriteableState) -> None:
+    def unlock(self, state: WriteableState) -> bool:
         try:
-            self.dump(state)
+            return self.dump(state)
         finally:
             self.release()
 
-    def dump(self, state: WriteableState) -> None:
+    def dump(self, state: WriteableState) -> bool:
+        """Write the state unless the file already contains it, returning whether it changed."""
+        contents = io.StringIO()
+        state.dump(contents)
         self.file.seek(0)
-        state.dump(self.file)
+        if self.file.readable() and self.file.read() == contents.getvalue():
+            return False
+        self.file.seek(0)
+        self.file.write(contents.getvalue())
         self.file.truncate()
+        return True
 
     def load[T: ReadableState](self, loader: type[T]) -> T:
         self.file.seek(0)
@@ -87,10 +101,15 @@ class FileSystemLock:
 
 @dataclass(frozen=True)
 class FileSystemSemaphore:
+    """Let one process (the leader) do a task while the others (followers) wait for it.
+
+    The leader holds the semaphore exclusively until it has finished, so followers wait for it
+    to be shared.
+    """
+
     semaphore: PyFile
     leader: bool
-    key: str
-    TIMEOUT_SECONDS: ClassVar[float] = 1.0
+    key: str | None
 
     def __del__(self) -> None:
         self.release()
@@ -100,14 +119,10 @@ class FileSystemSemaphore:
         file = open(filepath, "a+")  # noqa: SIM115
         try:
             fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
-            cls.write_key(file)
         except OSError:
-            leader = False
-        else:
-            leader = True
-        fcntl.flock(file, fcntl.LOCK_SH)
-        time = cls.read_key(file)
-        return cls(file, leader, time)
+            return cls(file, leader=False, key=None)
+        cls.write_key(file)
+        return cls(file, leader=True, key=cls.read_key(file))
 
     @classmethod
     def write_key(cls, file: PyFile) -> None:
@@ -129,17 +144,54 @@ class FileSystemSemaphore:
 
     def notify(self, monitor: AbsFile) -> None:
         with open(monitor, "w") as f:
-            f.write(self.key)
+            f.write(strict_not_none(self.key))
             f.flush()
+        # Wake up the followers.
+        fcntl.flock(self.semaphore, fcntl.LOCK_SH)
 
     def wait(self, monitor: AbsFile) -> None:
-        start_time = time.time()
-        while time.time() < start_time + self.TIMEOUT_SECONDS:
-            with contextlib.suppress(OSError), open(monitor) as f:
-                if f.read() == self.key:
-                    return
-            time.sleep(0.01)
-        raise TimeoutError("Wait timed out while waiting for another process to complete the task.")
+        if not self._lock_shared(ProgramState.lock_timeout):
+            raise TimeoutError(
+                "Wait timed out while waiting for another process to complete the task."
+            )
+        key = self.read_key(self.semaphore)
+        with contextlib.suppress(OSError), open(monitor) as f:
+            if f.read() == key:
+                return
+        raise RuntimeError("Another process failed to complete the task.")
+
+    def _lock_shared(self, timeout: float) -> bool:
+        # `flock` has no timeout, so block in a thread that is left behind if the leader takes too long.
+        # It locks a duplicate of the file descriptor, so the semaphore can be closed meanwhile.
+        fd = os.dup(self.semaphore.fileno())
+        locked: Future[None] = Future()
+
+        def lock_shared() -> None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+            except OSError as e:
+                locked.set_exception(e)
+            else:
+                locked.set_result(None)
+            finally:
+                os.close(fd)
+
+        threading.Thread(target=lock_shared, daemon=True).start()
+        try:
+            locked.result(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    @contextlib.contextmanager
+    def release_on_error(self) -> Iterator[None]:
+        # Followers are blocked until the leader releases the semaphore, so do not wait for it to
+        # be garbage collected (eg when a traceback keeps it alive).
+        try:
+            yield
+        except BaseException:
+            self.release()
+            raise
 
     def release(self) -> None:
         self.semaphore.close()
@@ -4,6 +4,7 @@ import contextlib
 import filecmp
 from multiprocessing import Process, Queue
 import random
+import threading
 import time
 from typing import TYPE_CHECKING, Self
 from unittest import mock
@@ -12,6 +13,7 @@ import pytest
 
 from .constants import MIRROR_LOCK, MIRROR_SEMAPHORE_EXTENSION
 from .lock import FileSystemLock, FileSystemSemaphore
+from .logger import ProgramState
 from .typed_path import AbsDir, AbsFile, RelDir, RelFile
 from .types import PyFile
 
@@ -197,8 +199,42 @@ def test_file_system_semaphore_single_process_interleaved(
         leader_lock.release()
 
 
+def test_file_system_semaphore_follower_blocks_until_notified(
+    tmp_lock_path: AbsFile, tmp_extra_lock_path: AbsFile
+) -> None:
+    leader_lock = FileSystemSemaphore.acquire(tmp_lock_path)
+    follower_lock = FileSystemSemaphore.acquire(tmp_lock_path)
+    follower = threading.Thread(target=follower_lock.synchronize, args=(tmp_extra_lock_path,))
+    follower.start()
+    follower.join(0.2)
+    assert follower.is_alive()
+    leader_lock.synchronize(tmp_extra_lock_path)
+    follower.join(1.0)
+    assert not follower.is_alive()
+
+
+def test_file_system_semaphore_timeout(
+    tmp_lock_path: AbsFile, tmp_extra_lock_path: AbsFile
+) -> None:
+    leader_lock = FileSystemSemaphore.acquire(tmp_lock_path)
+    follower_lock = FileSystemSemaphore.acquire(tmp_lock_path)
+    with mock.patch.object(ProgramState, "lock_timeout", 0.1), pytest.raises(TimeoutError):
+        follower_lock.synchronize(tmp_extra_lock_path)
+    assert leader_lock.leader
+
+
+def test_file_system_semaphore_leader_failure(
+    tmp_lock_path: AbsFile, tmp_extra_lock_path: AbsFile
+) -> None:
+    leader_lock = FileSystemSemaphore.acquire(tmp_lock_path)
+    follower_lock = FileSystemSemaphore.acquire(tmp_lock_path)
+    leader_lock.release()
+    with pytest.raises(RuntimeError):
+        follower_lock.synchronize(tmp_extra_lock_path)
+
+
 def single_follower_process(semaphore_path: AbsFile, monitor_path: AbsFile) -> None:
-    with mock.patch.object(FileSystemSemaphore, "TIMEOUT_SECONDS", 0.5):
+    with mock.patch.object(ProgramState, "lock_timeout", 0.5):
         lock = FileSystemSemaphore.acquire(semaphore_path)
         lock.synchronize(monitor_path)
         lock.release()
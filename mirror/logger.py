@@ -1,24 +1,44 @@
 import abc
 from collections.abc import Callable
-from dataclasses import KW_ONLY, dataclass
+from dataclasses import dataclass
 import functools
-import inspect
 import sys
 from types import TracebackType
 from typing import ClassVar, Literal
 
 from loguru import logger
 
-from .constants import DONE_SUFFIX, FAILURE_SUFFIX, LOADING_SUFFIX
+from .constants import (
+    DONE_SUFFIX,
+    FAILURE_SUFFIX,
+    LOADING_SUFFIX,
+    MIRROR_DEFAULT_CACHE_TTL,
+    MIRROR_DEFAULT_JOBS,
+    MIRROR_DEFAULT_JOBS_PER_HOST,
+    MIRROR_DEFAULT_LOCK_TIMEOUT,
+)
 from .utils import strict_cast
 
 
-@dataclass(frozen=True, slots=True)
+@dataclass(frozen=True, slots=True, init=False)
 class describe:  # noqa: N801
+    """Log the start and end of a task.
+
+    `args` are formatted into `message` only when it is logged, and callable arguments are called then.
+    """
+
     message: str
-    _: KW_ONLY
-    level: str = "TRACE"
-    error_level: str = "ERROR"
+    args: tuple[object, ...]
+    level: str
+    error_level: str
+
+    def __init__(
+        self, message: str, /, *args: object, level: str = "TRACE", error_level: str = "ERROR"
+    ) -> None:
+        object.__setattr__(self, "message", message)
+        object.__setattr__(self, "args", args)
+        object.__setattr__(self, "level", level)
+        object.__setattr__(self, "error_level", error_level)
 
     @property
     def start_message(self) -> str:
@@ -33,19 +53,30 @@ class describe:  # noqa: N801
         return f"{self.message} {FAILURE_SUFFIX}"
 
     def log(self, message: str, /) -> None:
-        logger.opt(depth=self.depth).log(self.level, message)
+        self._log(self.level, message)
 
     def error_log(self, message: str, /) -> None:
-        logger.opt(depth=self.depth).log(self.error_level, message)
+        self._log(self.error_level, message)
+
+    def _log(self, level: str, message: str) -> None:
+        # Finding the caller is slow, so is skipped for messages that would be dropped.
+        if is_enabled(level):
+            args = [arg() if callable(arg) else arg for arg in self.args]
+            logger.opt(depth=self.depth).log(level, message, *args)
 
     @property
     def depth(self) -> int:
         """Return the depth of the first frame not in the file."""
-        for depth, frameinfo in enumerate(inspect.stack(), start=-1):
-            if frameinfo.filename != __file__:
-                return depth
-        # Fallback if cannot determine caller.
-        return 0
+        # Walk raw frames as inspect.stack reads source lines for every frame.
+        frame = sys._getframe(1)
+        depth = 0
+        while frame.f_code.co_filename == __file__:
+            if frame.f_back is None:
+                # Fallback if cannot determine caller.
+                return 0
+            frame = frame.f_back
+            depth += 1
+        return depth
 
     def __enter__(self) -> None:
         self.log(self.start_message)
@@ -73,6 +104,12 @@ class describe:  # noqa: N801
 class ProgramState(abc.ABC):
     type CommandName = Literal["install", "sync", "check"]
     command: ClassVar[CommandName]
+    jobs: ClassVar[int] = MIRROR_DEFAULT_JOBS
+    jobs_per_host: ClassVar[int] = MIRROR_DEFAULT_JOBS_PER_HOST
+    cache_ttl: ClassVar[float] = MIRROR_DEFAULT_CACHE_TTL
+    lock_timeout: ClassVar[float] = MIRROR_DEFAULT_LOCK_TIMEOUT
+    log_level: ClassVar[str | int] = "INFO"
+    use_daemon: ClassVar[bool] = True
 
     @abc.abstractmethod
     def __init__(self) -> None: ...
@@ -112,5 +149,17 @@ def log_level_name(quiet: int, verbose: int) -> str | int:
 
 
 def setup_logger(quiet: int, verbose: int) -> None:
+    ProgramState.log_level = log_level_name(quiet, verbose)
     logger.remove()
-    logger.add(sys.stdout, level=log_level_name(quiet, verbose), format="<level>{message}</level>")
+    logger.add(sys.stdout, level=ProgramState.log_level, format="<level>{message}</level>")
+
+
+def is_enabled(level: str) -> bool:
+    # Loguru has no public check, so compare against the lowest level of any handler.
+    min_level = getattr(getattr(logger, "_core", None), "min_level", 0)
+    return bool(logger.level(level).no >= min_level)
+
+
+def error_message(e: BaseException) -> str:
+    message = str(e).strip()
+    return f"{type(e).__name__}{f': {message}' if message else ''}"
@@ -1,7 +1,9 @@
 from collections.abc import Callable, Generator
 import contextlib
+import sys
 import textwrap
 from typing import Any
+from unittest import mock
 
 from loguru import logger
 import pytest
@@ -167,6 +169,56 @@ def test_logger_wrap_failure_trace(caplog: LogCaptureFixture) -> None:
     )
 
 
+@pytest.mark.parametrize("use_wrapper", [False, True])
+def test_logger_records_caller(use_wrapper: bool) -> None:
+    records: list[Any] = []
+    handler = logger.add(lambda message: records.append(message.record), level="TRACE")
+
+    def caller() -> None:
+        if use_wrapper:
+            describe("caller test")(lambda: None)()
+        else:
+            with describe("caller test"):
+                ...
+
+    try:
+        caller()
+    finally:
+        logger.remove(handler)
+    assert [(record["function"], record["file"].path) for record in records] == [
+        ("caller", __file__),
+        ("caller", __file__),
+    ]
+
+
+# Override log level for this test.
+@pytest.mark.parametrize("log_level", ["INFO"])
+def test_logger_formats_arguments_lazily(caplog: LogCaptureFixture) -> None:
+    calls: list[str] = []
+
+    def argument(level: str) -> str:
+        calls.append(level)
+        return level.lower()
+
+    with mock.patch("sys._getframe", wraps=sys._getframe) as getframe:
+        with describe("{} test", lambda: argument("DEBUG"), level="DEBUG"):
+            ...
+        assert not getframe.called
+    with describe("{} test", lambda: argument("INFO"), level="INFO"):
+        ...
+
+    assert calls == ["INFO", "INFO"]
+    assert (
+        caplog.text.strip()
+        == textwrap.dedent(
+            """
+            info test ...
+            info test [done]
+            """
+        ).strip()
+    )
+
+
 @pytest.mark.parametrize(
     "quiet, verbose, level",
     [
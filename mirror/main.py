@@ -6,20 +6,27 @@ import os
 from pathlib import Path
 import sys
 import traceback
+from typing import TYPE_CHECKING, Any
 
 import click
-from git import InvalidGitRepositoryError
 from loguru import logger
 
-from .checker import MirrorChecker
-from .constants import MIRROR_FILE, MIRROR_NAME
-from .githelper import GitHelper
-from .installer import InstallSource, MirrorInstaller
-from .logger import ProgramState, setup_logger
-from .syncer import MirrorSyncer
-from .typed_path import AbsDir, AbsFile, GitDir, RelFile, Remote
+from .constants import (
+    MIRROR_DEFAULT_CACHE_TTL,
+    MIRROR_DEFAULT_JOBS,
+    MIRROR_DEFAULT_JOBS_PER_HOST,
+    MIRROR_DEFAULT_LOCK_TIMEOUT,
+    MIRROR_FILE,
+)
+from .daemon import DaemonRequest, MirrorDaemon
+from .logger import ProgramState, error_message, setup_logger
+from .typed_path import AbsDir, AbsFile, GitDir, RelDir, RelFile, Remote
 from .types import ExitCode
 
+# Commands import what they need (eg GitPython and PyYAML) when they run, to keep startup fast.
+if TYPE_CHECKING:
+    from .installer import InstallSource
+
 
 def check_for_errors[**P](fn: Callable[P, ExitCode | None]) -> Callable[P, None]:
     @functools.wraps(fn)
@@ -28,9 +35,8 @@ def check_for_errors[**P](fn: Callable[P, ExitCode | None]) -> Callable[P, None]
             exitcode = fn(*args, **kwargs)
         except BaseException as e:  # noqa: BLE001
             logger.debug(f"Threw {type(e)}!")
-            logger.trace(traceback.format_exc())
-            message = str(e).strip()
-            logger.error(f"{type(e).__name__}{f': {message}' if message else ''}")
+            logger.opt(lazy=True).trace("{}", traceback.format_exc)
+            logger.error(error_message(e))
             sys.exit(1)
         if exitcode is not None:
             sys.exit(exitcode)
@@ -53,13 +59,88 @@ def check_for_errors[**P](fn: Callable[P, ExitCode | None]) -> Callable[P, None]
     help="Display less output (repeat up to 4 times).",
     show_default=False,
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=MIRROR_DEFAULT_JOBS,
+    envvar="MIRROR_JOBS",
+    help="Number of repos to fetch at the same time.",
+)
+@click.option(
+    "--jobs-per-host",
+    type=click.IntRange(min=1),
+    default=MIRROR_DEFAULT_JOBS_PER_HOST,
+    envvar="MIRROR_JOBS_PER_HOST",
+    help="Number of repos to fetch at the same time from a single host.",
+)
+@click.option(
+    "--cache-ttl",
+    type=click.FloatRange(min=0),
+    default=MIRROR_DEFAULT_CACHE_TTL,
+    envvar="MIRROR_CACHE_TTL",
+    help="Number of seconds to reuse a fetched repo before fetching it again.",
+)
+@click.option(
+    "--lock-timeout",
+    type=click.FloatRange(min=0),
+    default=MIRROR_DEFAULT_LOCK_TIMEOUT,
+    envvar="MIRROR_LOCK_TIMEOUT",
+    help="Number of seconds to wait for another process that is fetching the same repo.",
+)
+@click.option("--refresh", is_flag=True, help="Fetch all repos, even if recently fetched.")
+@click.option(
+    "--cache-max-bytes",
+    type=click.IntRange(min=0),
+    default=None,
+    envvar="MIRROR_CACHE_MAX_BYTES",
+    help="Evict the least recently used repos after each command to keep the cache within this size.",
+)
+@click.option(
+    "--daemon/--no-daemon",
+    default=True,
+    envvar="MIRROR_DAEMON",
+    help="Run `check` and `sync` in the daemon if it is running.",
+)
 @check_for_errors
-def main(quiet: int, verbose: int) -> None:
+def main(
+    quiet: int,
+    verbose: int,
+    jobs: int,
+    jobs_per_host: int,
+    cache_ttl: float,
+    lock_timeout: float,
+    refresh: bool,
+    cache_max_bytes: int | None,
+    daemon: bool,
+) -> None:
     setup_logger(quiet, verbose)
-    check_git_repo()
+    ProgramState.use_daemon = daemon
+    ProgramState.jobs = jobs
+    ProgramState.jobs_per_host = jobs_per_host
+    ProgramState.cache_ttl = 0.0 if refresh else cache_ttl
+    ProgramState.lock_timeout = lock_timeout
+    if cache_max_bytes is not None:
+        click.get_current_context().call_on_close(functools.partial(evict, cache_max_bytes))
+
+
+def evict(max_bytes: int) -> None:
+    from .cache import MirrorCache
+
+    try:
+        MirrorCache.gc(max_bytes)
+    except OSError as e:
+        logger.debug(e)
 
 
 def check_git_repo() -> None:
+    if (AbsDir.cwd() / RelDir(".git")).exists():
+        # Skip loading GitPython in the common case.
+        return
+    from git import InvalidGitRepositoryError
+
+    from .githelper import GitHelper
+
     try:
         GitHelper.repo(AbsDir.cwd())
     except InvalidGitRepositoryError as e:
@@ -68,6 +149,22 @@ def check_git_repo() -> None:
         ) from e
 
 
+def forward_to_daemon(command: ProgramState.CommandName, **options: Any) -> ExitCode | None:
+    if not ProgramState.use_daemon:
+        return None
+    request = DaemonRequest(
+        command,
+        os.fspath(AbsDir.cwd()),
+        log_level=ProgramState.log_level,
+        jobs=ProgramState.jobs,
+        jobs_per_host=ProgramState.jobs_per_host,
+        cache_ttl=ProgramState.cache_ttl,
+        lock_timeout=ProgramState.lock_timeout,
+        **options,
+    )
+    return MirrorDaemon.forward(request)
+
+
 @main.command()
 @click.option("--config-file", "--config", "-c", default=os.fspath(MIRROR_FILE))
 @click.option("--config-repo", "-C", default=None)
@@ -93,6 +190,8 @@ def install(config_file: str, config_repo: str | None) -> None:
     # Install using a local config.
     mirror install --config /configs/mirror-config.yml
     """
+    from .installer import MirrorInstaller
+
     config_path = Path(config_file)
     source_path = AbsFile(config_path) if config_path.is_absolute() else RelFile(config_path)
     source_remote = None if config_repo is None else Remote(config_repo)
@@ -102,6 +201,7 @@ def install(config_file: str, config_repo: str | None) -> None:
         if isinstance(source_path, AbsFile):
             source_path = RelFile(source_path.path.relative_to("/"))
         source = (source_remote, source_path)
+    check_git_repo()
     installer = MirrorInstaller(target=GitDir.cwd(), source=source)
     installer.install()
 
@@ -118,24 +218,95 @@ def check(pre_commit: bool) -> ExitCode:
     # Check the current directory.
     mirror check
     """
+    check_git_repo()
+    if (exitcode := forward_to_daemon("check", pre_commit=pre_commit)) is not None:
+        return exitcode
+    from .checker import MirrorChecker
+
     checker = MirrorChecker(target=GitDir.cwd())
-    if (return_value := checker.check()) and pre_commit:
-        logger.critical(
-            f"{MIRROR_NAME} config files are not up to date; run `mirror sync` to update."
-        )
-    return return_value
+    return checker.check(pre_commit=pre_commit)
 
 
 @main.command()
+@click.option(
+    "--repos",
+    multiple=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="Sync these repos instead of the current directory (can be repeated).",
+)
+@click.option(
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Sync the repos listed in this file (one per line, relative to the file).",
+)
 @check_for_errors
 @ProgramState.record_command
-def sync() -> None:
+def sync(repos: tuple[str, ...], manifest: str | None) -> ExitCode | None:
     """Sync files from Mirror|rorriM with their remotes.
 
     \b
     Example:
     # Sync the current directory.
     mirror sync
+
+    \b
+    # Sync several repos at once.
+    mirror sync --repos service-a --repos service-b
     """
+    from .fleet import MirrorFleet
+    from .syncer import MirrorSyncer
+
+    targets = [AbsDir(os.path.abspath(repo)) for repo in repos]
+    if manifest is not None:
+        targets.extend(MirrorFleet.from_manifest(AbsFile(os.path.abspath(manifest))))
+    if targets:
+        return MirrorFleet(targets).sync(jobs=ProgramState.jobs)
+    check_git_repo()
+    if (exitcode := forward_to_daemon("sync")) is not None:
+        return exitcode
     syncer = MirrorSyncer(target=GitDir.cwd())
     syncer.sync()
+    return None
+
+
+@main.command()
+@check_for_errors
+def daemon() -> None:
+    """Serve `check` and `sync` from a long-running process.
+
+    While the daemon is running, `mirror check` and `mirror sync` are forwarded to it.
+
+    \b
+    Example:
+    # Start a daemon that reuses repos fetched in the last minute.
+    mirror --cache-ttl 60 daemon
+    """
+    MirrorDaemon.serve()
+
+
+@main.group()
+def cache() -> None:
+    """Manage the cache of remote repos."""
+
+
+@cache.command()
+@click.option(
+    "--max-bytes",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Size to shrink the cache to (by default, remove everything that is not in use).",
+)
+@check_for_errors
+def gc(max_bytes: int) -> None:
+    """Remove the least recently used repos from the cache.
+
+    \b
+    Example:
+    # Keep the cache under 1GB.
+    mirror cache gc --max-bytes 1000000000
+    """
+    from .cache import MirrorCache
+
+    removed = MirrorCache.gc(max_bytes)
+    logger.info(f"Removed {len(removed)} repos from the cache.")
@@ -276,3 +276,16 @@ def test_pre_commit_with_mirror(
     GitHelper.run_command(local_git_repo, "config", "user.name", "github-actions[bot]")
     commit_result = GitHelper.run_command(local_git_repo, "commit", "-am", "Setup mirror")
     assert commit_result.returncode == 0
+
+
+def test_startup_defers_imports() -> None:
+    code = "import sys, mirror; mirror.main_cli; print(*sys.modules)"
+    modules = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    assert "mirror.main" in modules
+    assert not {"git", "yaml", "mirror.githelper"} & set(modules)
@@ -26,6 +26,7 @@ class MirrorManager(abc.ABC):
         try:
             result = main()
             lock.unlock(self.state)
+            # The config may have been edited even when the lock is unchanged.
             GitHelper.add(self.target, MIRROR_LOCK, MIRROR_FILE)
             return result
         except BaseException as e:
@@ -81,7 +82,7 @@ class ExistingMirrorManager(MirrorManager):
         return self._existing_lock()
 
     def load_config(self) -> MirrorConfig:
-        return Parser.parse_file(self.target / MIRROR_FILE)
+        return Parser.parse_file_cached(self.target / MIRROR_FILE)
 
     def load_state(self) -> MirrorState:
         try:
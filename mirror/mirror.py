@@ -5,14 +5,17 @@ from collections.abc import Iterator, Sequence
 from dataclasses import dataclass
 from typing import Self
 
+from git import GitCommandError
 from loguru import logger
 
 from .config import MirrorConfig
-from .logger import describe
+from .diff import Diff
+from .logger import ProgramState, describe
 from .repo import MirrorRepo
 from .state import MirrorState
 from .typed_path import GitDir
 from .types import ExitCode
+from .utils import run_ahead_in_parallel, run_in_parallel
 
 
 @dataclass(frozen=True)
@@ -44,12 +47,33 @@ class Mirror:
 
     @describe("Checking out all repos", level="INFO")
     def checkout_all(self) -> None:
-        for repo in self:
-            repo.checkout()
+        run_in_parallel(MirrorRepo.checkout, self, jobs=ProgramState.jobs)
 
     def update_all(self, target: GitDir) -> None:
-        for repo in self:
-            repo.update(target)
+        """Apply the diffs of each repo in config order, while the diffs of later repos are computed."""
+        for batch in self._diff_batches():
+            self._apply_batch(batch, target)
+
+    def _diff_batches(self) -> Iterator[list[tuple[MirrorRepo, Sequence[Diff]]]]:
+        if ProgramState.jobs <= 1:
+            yield [(repo, repo.diffs()) for repo in self]
+            return
+        # Bound the diffs held in memory while they wait to be applied.
+        yield from run_ahead_in_parallel(
+            MirrorRepo.diffs, self, jobs=ProgramState.jobs, buffer=2 * ProgramState.jobs
+        )
+
+    @classmethod
+    def _apply_batch(
+        cls, batch: Sequence[tuple[MirrorRepo, Sequence[Diff]]], target: GitDir
+    ) -> None:
+        try:
+            Diff.apply_all([diff for _, repo_diffs in batch for diff in repo_diffs], target)
+        except GitCommandError as e:
+            logger.debug(e)
+            # Apply patches one at a time to find the one that failed.
+            for repo, repo_diffs in batch:
+                repo.apply_individually(repo_diffs, target)
 
     @property
     def state(self) -> MirrorState:
@@ -1,6 +1,7 @@
 from collections.abc import Callable
 import os
 import tempfile
+from unittest import mock
 
 from inline_snapshot import snapshot
 from inline_snapshot._external._external_file import ExternalFile
@@ -9,10 +10,12 @@ from pytest import LogCaptureFixture
 
 from .config_parser import Parser
 from .constants import MIRROR_LOCK
+from .logger import ProgramState
 from .mirror import Mirror
+from .repo import MissingFileError
 from .state import MirrorState
 from .test_utils import add_commit, normalize_message, quick_mirror, quick_mirror_repo
-from .typed_path import AbsDir, RelDir, RelFile
+from .typed_path import AbsDir, GitDir, RelDir, RelFile
 from .types import ExitCode
 
 
@@ -237,3 +240,47 @@ def test_mirror_check(
         caplog.text.strip(), git_dir=[AbsDir(repo.source.repo) for repo in mirror]
     )
     assert log_message == expected_message
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_mirror_checkout_all_reports_first_error_in_order(jobs: int) -> None:
+    remotes = [tempfile.mkdtemp() for _ in range(4)]
+    for remote in remotes:
+        add_commit(remote, dict(file="file"))
+    mirror = quick_mirror(
+        [
+            quick_mirror_repo(remotes[0], ["file"]),
+            quick_mirror_repo(remotes[1], ["missing1"]),
+            quick_mirror_repo(remotes[2], ["file"]),
+            quick_mirror_repo(remotes[3], ["missing2"]),
+        ]
+    )
+    with mock.patch.object(ProgramState, "jobs", jobs), pytest.raises(MissingFileError) as e:
+        mirror.checkout_all()
+    assert e.value.file == RelFile("missing1")
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_mirror_update_all_stops_at_first_error(jobs: int, local_git_repo: GitDir) -> None:
+    remotes = [tempfile.mkdtemp() for _ in range(6)]
+    commits = [add_commit(remote, dict(file="v1")) for remote in remotes]
+    for remote in remotes:
+        add_commit(remote, dict(file="v2"))
+    mirror = quick_mirror(
+        [
+            quick_mirror_repo(remote, [("file", f"file{i}", commit)])
+            for i, (remote, commit) in enumerate(zip(remotes, commits, strict=True))
+        ]
+    )
+    mirror.checkout_all()
+    add_commit(local_git_repo, {f"file{i}": "v1" for i in range(len(remotes)) if i not in (2, 4)})
+
+    with mock.patch.object(ProgramState, "jobs", jobs), pytest.raises(RuntimeError) as e:
+        mirror.update_all(local_git_repo)
+    assert str(e.value).endswith("to 'file2'.")
+    for i in (0, 1):
+        with open(local_git_repo / RelFile(f"file{i}")) as f:
+            assert f.read() == "v2"
+    for i in (3, 5):
+        with open(local_git_repo / RelFile(f"file{i}")) as f:
+            assert f.read() == "v1"
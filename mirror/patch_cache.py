@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+import contextlib
+from dataclasses import dataclass
+import hashlib
+import os
+
+from loguru import logger
+
+from .constants import (
+    MIRROR_BLOB_EXTENSION,
+    MIRROR_CACHE,
+    MIRROR_PATCH_CACHE,
+    MIRROR_PATCH_CACHE_MAX_BYTES,
+    MIRROR_PATCH_EXTENSION,
+)
+from .typed_path import AbsDir, AbsFile, RelFile, Remote
+from .types import Commit
+from .utils import TMP_PREFIX, write_atomically
+
+
+@dataclass(frozen=True)
+class PatchKey:
+    source: Remote
+    old: Commit | None
+    new: Commit
+    file: RelFile
+
+    @property
+    def hash(self) -> str:
+        # Commits are immutable, so the diff between them never changes.
+        parts = [
+            self.source.canonical,
+            "" if self.old is None else self.old.sha,
+            self.new.sha,
+            os.fspath(self.file),
+        ]
+        return hashlib.blake2b(
+            "\0".join(parts).encode("utf-8", errors="surrogateescape"), usedforsecurity=False
+        ).hexdigest()
+
+
+@dataclass(frozen=True)
+class RawPatch:
+    """A diff of the source file before its paths are rewritten for a target."""
+
+    patch: str
+    blob: bytes | None
+
+
+class PatchCache:
+    @classmethod
+    def directory(cls, cache: AbsDir | None = None) -> AbsDir:
+        return (MIRROR_CACHE if cache is None else cache) / MIRROR_PATCH_CACHE
+
+    @classmethod
+    def _files(cls, key: PatchKey) -> tuple[AbsFile, AbsFile]:
+        entry = cls.directory() / RelFile(key.hash)
+        return entry + MIRROR_PATCH_EXTENSION, entry + MIRROR_BLOB_EXTENSION
+
+    @classmethod
+    def get(cls, key: PatchKey) -> RawPatch | None:
+        patch_file, blob_file = cls._files(key)
+        try:
+            with open(patch_file, "rb") as f:
+                patch = f.read().decode("utf-8", errors="surrogateescape")
+            blob = None
+            if key.old is not None:
+                with open(blob_file, "rb") as f:
+                    blob = f.read()
+            # Mark the entry as recently used.
+            os.utime(patch_file)
+        except OSError:
+            return None
+        return RawPatch(patch, blob)
+
+    @classmethod
+    def put_all(cls, patches: Mapping[PatchKey, RawPatch]) -> None:
+        try:
+            for key, patch in patches.items():
+                cls._put(key, patch)
+        except OSError as e:
+            logger.debug(e)
+        cls.evict(MIRROR_PATCH_CACHE_MAX_BYTES)
+
+    @classmethod
+    def _put(cls, key: PatchKey, patch: RawPatch) -> None:
+        patch_file, blob_file = cls._files(key)
+        # The patch is written last, so it is only read once the blob is complete.
+        if patch.blob is not None:
+            write_atomically(blob_file, patch.blob)
+        write_atomically(patch_file, patch.patch.encode("utf-8", errors="surrogateescape"))
+
+    @classmethod
+    def evict(cls, max_bytes: int, cache: AbsDir | None = None) -> int:
+        """Remove the least recently used patches until they fit within `max_bytes`."""
+        directory = cls.directory(cache)
+        sizes: dict[str, int] = {}
+        last_access: dict[str, float] = {}
+        with contextlib.suppress(FileNotFoundError):
+            for entry in os.scandir(directory):
+                if entry.name.startswith(TMP_PREFIX):
+                    # Being written by another process.
+                    continue
+                with contextlib.suppress(OSError):
+                    name, extension = os.path.splitext(entry.name)
+                    stat = entry.stat(follow_symlinks=False)
+                    sizes[name] = sizes.get(name, 0) + stat.st_size
+                    if extension == MIRROR_PATCH_EXTENSION.extension:
+                        last_access[name] = stat.st_mtime
+        total_size = sum(sizes.values())
+        # Blobs without a patch were never completed, so are removed first.
+        for name in sorted(sizes, key=lambda name: last_access.get(name, 0.0)):
+            if total_size <= max_bytes and name in last_access:
+                break
+            for file_extension in (MIRROR_PATCH_EXTENSION, MIRROR_BLOB_EXTENSION):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(directory / RelFile(name) + file_extension)
+            total_size -= sizes[name]
+        return total_size
@@ -0,0 +1,64 @@
+import os
+from unittest import mock
+
+from .constants import MIRROR_PATCH_EXTENSION
+from .diff import Diff
+from .githelper import GitHelper
+from .patch_cache import PatchCache, PatchKey, RawPatch
+from .test_utils import add_commit, quick_versioned_mirror_file
+from .typed_path import AbsDir, GitDir, RelFile, Remote
+from .types import Commit
+
+
+def quick_patch_key(file: str, old: str | None = "a" * 40) -> PatchKey:
+    return PatchKey(
+        Remote("https://github.com/example/repo"),
+        None if old is None else Commit(old),
+        Commit("b" * 40),
+        RelFile(file),
+    )
+
+
+def test_patch_cache_round_trip() -> None:
+    patches = {
+        quick_patch_key("file"): RawPatch("diff --git a/file b/file\n\udcff\n", b"\xff\x00blob"),
+        quick_patch_key("new", old=None): RawPatch("diff --git a/new b/new\n", None),
+    }
+    assert all(PatchCache.get(key) is None for key in patches)
+    PatchCache.put_all(patches)
+    assert {key: PatchCache.get(key) for key in patches} == patches
+    assert PatchCache.get(quick_patch_key("other")) is None
+
+
+def test_patch_cache_evicts_least_recently_used(isolated_cache: AbsDir) -> None:
+    keys = [quick_patch_key(f"file{i}") for i in range(3)]
+    PatchCache.put_all({key: RawPatch("x" * 100, b"y" * 100) for key in keys})
+    directory = PatchCache.directory(isolated_cache)
+    for i, key in enumerate(keys):
+        patch_file = directory / RelFile(key.hash) + MIRROR_PATCH_EXTENSION
+        os.utime(patch_file, (i, i))
+    assert PatchCache.get(keys[0]) is not None
+
+    assert PatchCache.evict(400) == 400
+    assert PatchCache.get(keys[0]) is not None
+    assert PatchCache.get(keys[1]) is None
+    assert PatchCache.get(keys[2]) is not None
+    assert PatchCache.evict(0) == 0
+    assert os.listdir(directory) == []
+
+
+def test_diff_reuses_cached_patches_across_targets(local_git_repo: GitDir) -> None:
+    source = Remote("https://github.com/example/repo")
+    initial_commit = add_commit(local_git_repo, dict(file="v1\n", other="v1\n"))
+    add_commit(local_git_repo, dict(file="v2\n", other="v2\n"))
+    first = [quick_versioned_mirror_file("file", commit=initial_commit)]
+    second = [
+        quick_versioned_mirror_file("file", "renamed", commit=initial_commit),
+        quick_versioned_mirror_file("other", commit=initial_commit),
+    ]
+    Diff.from_files(local_git_repo, first, source=source)
+    with mock.patch.object(GitHelper, "file_diffs", wraps=GitHelper.file_diffs) as file_diffs:
+        diffs = Diff.from_files(local_git_repo, second, source=source)
+    file_diffs.assert_called_once_with(local_git_repo, initial_commit, [RelFile("other")])
+    assert diffs == Diff.from_files(local_git_repo, second)
+    assert "+++ b/renamed" in diffs[0].patch
@@ -1,4 +1,4 @@
-from collections.abc import Iterable, Sequence
+from collections.abc import Sequence
 from dataclasses import dataclass
 from typing import Self, cast
 
@@ -70,18 +70,22 @@ class MirrorRepo:
         return GitDir(MIRROR_CACHE / RelDir(self.source.hash), check=False)
 
     def checkout(self) -> None:
-        with describe(f"Syncing {self.source}", level="DEBUG"):
+        with describe("Syncing {}", self.source, level="DEBUG"):
             GitHelper.checkout(self.source, self.cache)
         self.verify_all_files_exist()
 
     def verify_all_files_exist(self) -> None:
+        index = GitHelper.tree_index(self.cache)
         for file in self.files:
-            if not file.exists_in(self.cache):
-                raise MissingFileError(self.source, file.source)
-            if file.is_folder_in(self.cache):
-                raise IsADirectoryError(self.source, file.source)
-            if not file.is_file_in(self.cache):
-                raise IrregularFileError(self.source, file.source)
+            match index.object_type(file.source):
+                case None:
+                    raise MissingFileError(self.source, file.source)
+                case "tree":
+                    raise IsADirectoryError(self.source, file.source)
+                case "blob":
+                    pass
+                case _:
+                    raise IrregularFileError(self.source, file.source)
 
     def all_up_to_date(self) -> bool:
         return all([self.up_to_date(file) for file in self.files])  # noqa: C419
@@ -97,18 +101,44 @@ class MirrorRepo:
                 )
         return up_to_date
 
-    def diffs(self) -> Iterable[Diff]:
-        for file in self.files:
-            try:
-                yield Diff.from_file(self.cache, file)
-            except GitCommandError as e:
-                version_info = "" if file.commit is None else f"from {file.commit} "
-                raise RuntimeError(
-                    f"Unable to calculate diff {version_info}for {file.source} (from {self.source})."
-                ) from e
+    def diffs(self) -> Sequence[Diff]:
+        files = self.outdated_files
+        if not files:
+            return []
+        try:
+            return Diff.from_files(self.cache, files, source=self.source)
+        except GitCommandError as e:
+            logger.debug(e)
+            # Diff files one at a time to find the one that failed.
+            return [self._diff(file) for file in files]
+
+    @property
+    def outdated_files(self) -> Sequence[VersionedMirrorFile]:
+        # Files mirrored from the current commit have empty diffs.
+        if all(file.commit is None for file in self.files):
+            return self.files
+        commit = self.commit
+        return [file for file in self.files if file.commit != commit]
+
+    def _diff(self, file: VersionedMirrorFile) -> Diff:
+        try:
+            return Diff.from_file(self.cache, file, source=self.source)
+        except GitCommandError as e:
+            version_info = "" if file.commit is None else f"from {file.commit} "
+            raise RuntimeError(
+                f"Unable to calculate diff {version_info}for {file.source} (from {self.source})."
+            ) from e
 
     def update(self, target: GitDir) -> None:
-        for diff in self.diffs():
+        diffs = self.diffs()
+        try:
+            Diff.apply_all(diffs, target)
+        except GitCommandError as e:
+            logger.debug(e)
+            self.apply_individually(diffs, target)
+
+    def apply_individually(self, diffs: Sequence[Diff], target: GitDir) -> None:
+        for diff in diffs:
             try:
                 diff.apply(target)
             except GitCommandError as e:
@@ -124,6 +154,12 @@ class MirrorRepo:
             files=sorted({file.source for file in self.files}),
         )
 
+    def contents(self, file: RelFile) -> bytes:
+        return GitHelper.file_blob(self.cache, self.commit, file)
+
+    def executable(self, file: RelFile) -> bool:
+        return GitHelper.tree_index(self.cache).executable(file)
+
     @property
     def commit(self) -> Commit:
-        return Commit(GitHelper.commit(self.cache))
+        return GitHelper.tree_index(self.cache).commit
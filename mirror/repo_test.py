@@ -139,8 +139,7 @@ def test_update_all(
         existing_file = test_data_path / RelDir("local") / file.target
         if existing_file.exists():
             shutil.copy2(existing_file, local_git_repo)
-    git.Repo.init(repo.cache)
-    shutil.copytree(test_data_path / RelDir("remote"), repo.cache, dirs_exist_ok=True)
+    add_commit(repo.cache, test_data_path / RelDir("remote"))
     repo.update(local_git_repo)
 
     repo_contents = {}
@@ -292,3 +291,47 @@ def test_repo_from_config(
     config: MirrorRepoConfig, state: MirrorRepoState | None, expected: MirrorRepo
 ) -> None:
     assert MirrorRepo.from_config(config, state) == expected
+
+
+def test_update_falls_back_to_individual_patches(local_git_repo: GitDir) -> None:
+    remote = tempfile.mkdtemp()
+    initial_commit = add_commit(remote, dict(good="v1", bad="v1"))
+    add_commit(remote, dict(good="v2", bad="v2"))
+    repo = quick_mirror_repo(remote, [("good", initial_commit), ("bad", initial_commit)])
+    repo.checkout()
+    add_commit(local_git_repo, dict(good="v1", bad="v1"))
+
+    apply_patch = GitHelper.apply_patch
+
+    def fail_on_bad(local: GitDir, patch: str) -> None:
+        if "b/bad" in patch:
+            raise git.GitCommandError("apply")
+        apply_patch(local, patch)
+
+    with (
+        mock.patch.object(GitHelper, "apply_patch", side_effect=fail_on_bad) as mock_apply,
+        pytest.raises(RuntimeError) as e,
+    ):
+        repo.update(local_git_repo)
+    assert mock_apply.call_count == 3
+    assert str(e.value).endswith("to 'bad'.")
+    with open(local_git_repo / RelFile("good")) as f:
+        assert f.read() == "v2"
+
+
+def test_update_stops_at_first_failed_patch(local_git_repo: GitDir) -> None:
+    remote = tempfile.mkdtemp()
+    initial_commit = add_commit(remote, dict(removed="v1", kept="v1"))
+    add_commit(remote, dict(removed="v2", kept="v2"))
+    repo = quick_mirror_repo(remote, [("removed", initial_commit), ("kept", initial_commit)])
+    repo.checkout()
+    add_commit(local_git_repo, dict(removed="v1", kept="v1"))
+    git.Repo(local_git_repo).index.remove(["removed"], working_tree=True)
+    git.Repo(local_git_repo).index.commit("Remove file")
+
+    with pytest.raises(RuntimeError) as e:
+        repo.update(local_git_repo)
+    assert str(e.value).endswith("to 'removed'.")
+    # Later files are left alone, so the target still matches the lock.
+    with open(local_git_repo / RelFile("kept")) as f:
+        assert f.read() == "v1"
@@ -1,19 +1,27 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from collections.abc import Iterator, Mapping, Sequence
+from collections.abc import Callable, Hashable, Iterator, Mapping, Sequence
 import dataclasses
 from dataclasses import dataclass
+import functools
 import os
 from pathlib import Path
 import re
 import typing
-from typing import TYPE_CHECKING, Any, ClassVar, Protocol, Self, cast
+from typing import TYPE_CHECKING, Any, ClassVar, NoReturn, Protocol, Self, cast
 
 import yaml
 from yaml import MappingNode, Node, ScalarNode, SequenceNode, YAMLError
 from yaml.constructor import ConstructorError
 
+try:
+    from yaml import CSafeDumper as FastDumper
+    from yaml import CSafeLoader as FastLoader
+except ImportError:
+    from yaml import SafeDumper as FastDumper  # type: ignore [assignment]
+    from yaml import SafeLoader as FastLoader  # type: ignore [assignment]
+
 from .typed_path import RelFile, Remote
 from .types import Commit
 from .utils import all_unique
@@ -34,16 +42,22 @@ class WriteableState(Protocol):
 class ReadWriteableState(ReadableState, WriteableState, Protocol): ...
 
 
+@dataclass(frozen=True, slots=True)
+class Codec[T]:
+    construct: Callable[[Node], T]
+    represent: Callable[[T], Any]
+
+
 class AutoState(yaml.YAMLObject):
     yaml_tag = None
 
     def dump(self, f: SupportsWrite[str]) -> None:
-        f.write(yaml.safe_dump(self.representation, default_flow_style=False))
+        f.write(yaml.dump(self.representation, Dumper=FastDumper, default_flow_style=False))
 
     @classmethod
     def load(cls, f: SupportsRead[str]) -> Self:
         try:
-            return cls.construct(cls, yaml.compose(f))
+            return cls.construct(cls, yaml.compose(f, Loader=FastLoader))
         except YAMLError as e:
             raise YAMLError("Unable to load data from lock file.") from e
 
@@ -51,14 +65,7 @@ class AutoState(yaml.YAMLObject):
     def represent(cls, obj: Any) -> Any:
         match obj:
             case _ if dataclasses.is_dataclass(obj):
-                try:
-                    [field] = dataclasses.fields(obj)
-                except ValueError:
-                    return {
-                        field.name: cls.represent(getattr(obj, field.name))
-                        for field in dataclasses.fields(obj)
-                    }
-                return cls.represent(getattr(obj, field.name))
+                return cls.codec(type(obj)).represent(obj)
             case list() | set() | tuple():
                 return [cls.represent(sub_obj) for sub_obj in obj]
             case os.PathLike():
@@ -73,35 +80,61 @@ class AutoState(yaml.YAMLObject):
 
     @classmethod
     def construct[T](cls, obj_cls: type[T] | str, node: Node) -> T:
-        if dataclasses.is_dataclass(obj_cls):
-            return cls._construct_dataclass(obj_cls, node)
+        return cls.codec(obj_cls).construct(node)
+
+    @classmethod
+    def codec[T](cls, obj_cls: type[T] | str) -> Codec[T]:
+        return cls._codec(cast(Hashable, obj_cls))
+
+    @classmethod
+    @functools.cache
+    def _codec(cls, obj_cls: Any) -> Codec[Any]:
+        """Build the codec for a type once, so loading and dumping need no reflection."""
+        if isinstance(obj_cls, type) and dataclasses.is_dataclass(obj_cls):
+            return cls._dataclass_codec(obj_cls)
         if cls.is_cls(obj_cls, str):
-            return cast(T, cls._construct_str(node))
+            return Codec(cls._construct_str, cls._represent_str)
         if cls.is_cls(obj_cls, Path):
-            return cast(T, Path(cls.construct(str, node)))
+            return Codec(cls._construct_path, os.fspath)
         if cls.is_cls(typing.get_origin(obj_cls), Sequence):
-            return cls._construct_sequence(cast(type[T], obj_cls), node)  # type: ignore[type-var]
+            return cls._sequence_codec(obj_cls)
         if isinstance(obj_cls, str):
-            return cls._construct_named_cls(obj_cls, node)
-        raise ConstructorError()
+            return cls.codec(cls._named_type(obj_cls))
+        return Codec(cls._construct_unknown, cls.represent)
 
     @classmethod
-    def _construct_dataclass[T: DataclassInstance](cls, obj_cls: type[T], node: Node) -> T:
-        fields = dataclasses.fields(obj_cls)
+    def _dataclass_codec[T: DataclassInstance](cls, obj_cls: type[T]) -> Codec[T]:
+        types = typing.get_type_hints(obj_cls)
+        fields = [
+            (field.name, cls.codec(types[field.name])) for field in dataclasses.fields(obj_cls)
+        ]
         try:
-            [field] = fields
+            [(name, codec)] = fields
         except ValueError:
-            if isinstance(node, MappingNode):
-                node_values = {cls._construct_str(key): value for key, value in node.value}
-                if node_values.keys() == {field.name for field in fields}:
-                    return obj_cls(
-                        **{
-                            field.name: cls.construct(field.type, node_values[field.name])
-                            for field in fields
-                        }
-                    )
-            raise ConstructorError() from None
-        return obj_cls(**{field.name: cls.construct(field.type, node)})
+            return Codec(
+                functools.partial(cls._construct_mapping, obj_cls, dict(fields)),
+                functools.partial(cls._represent_mapping, fields),
+            )
+        return Codec(
+            lambda node: obj_cls(**{name: codec.construct(node)}),
+            lambda obj: codec.represent(getattr(obj, name)),
+        )
+
+    @classmethod
+    def _construct_mapping[T](
+        cls, obj_cls: Callable[..., T], fields: Mapping[str, Codec], node: Node
+    ) -> T:
+        if isinstance(node, MappingNode):
+            node_values = {cls._construct_str(key): value for key, value in node.value}
+            if node_values.keys() == fields.keys():
+                return obj_cls(
+                    **{name: codec.construct(node_values[name]) for name, codec in fields.items()}
+                )
+        raise ConstructorError()
+
+    @classmethod
+    def _represent_mapping(cls, fields: Sequence[tuple[str, Codec]], obj: Any) -> dict[str, Any]:
+        return {name: codec.represent(getattr(obj, name)) for name, codec in fields}
 
     @classmethod
     def _construct_str(cls, node: Node) -> str:
@@ -110,15 +143,30 @@ class AutoState(yaml.YAMLObject):
         raise ConstructorError()
 
     @classmethod
-    def _construct_sequence[T: Sequence](cls, obj_cls: type[T], node: Node) -> T:
-        [item_cls] = typing.get_args(obj_cls)
-        if isinstance(node, SequenceNode):
-            return cast(T, [cls.construct(item_cls, item_node) for item_node in node.value])
+    def _represent_str(cls, obj: str) -> str:
+        if isinstance(obj, str):
+            return obj
+        raise TypeError()
+
+    @classmethod
+    def _construct_path(cls, node: Node) -> Path:
+        return Path(cls._construct_str(node))
+
+    @classmethod
+    def _construct_unknown(cls, node: Node) -> NoReturn:
         raise ConstructorError()
 
     @classmethod
-    def _construct_named_cls(cls, type_name: str, node: Node) -> Any:
-        return cls.construct(cls._named_type(type_name), node)
+    def _sequence_codec[T: Sequence](cls, obj_cls: type[T]) -> Codec[T]:
+        [item_cls] = typing.get_args(obj_cls)
+        item_codec = cls.codec(item_cls)
+
+        def construct(node: Node) -> T:
+            if isinstance(node, SequenceNode):
+                return cast(T, [item_codec.construct(item_node) for item_node in node.value])
+            raise ConstructorError()
+
+        return Codec(construct, lambda obj: [item_codec.represent(item) for item in obj])
 
     @classmethod
     def _named_type(cls, type_name: str) -> type:
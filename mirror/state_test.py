@@ -1,6 +1,8 @@
 from collections.abc import Sequence
+import io
 
 import pytest
+import yaml
 from yaml import Node, YAMLError
 
 from .state import AutoState, MirrorRepoState, MirrorState
@@ -240,3 +242,21 @@ def test_load(filename: str, expected: MirrorState | None, test_data_path: AbsDi
                 MirrorState.load(f)
         else:
             assert MirrorState.load(f) == expected
+
+
+def test_dump_load_round_trip() -> None:
+    state = quick_mirror_state(
+        [
+            quick_mirror_repo_state(
+                f"https://example.com/repo{i}", f"{i:040x}", [f"file{i}", "a/b"]
+            )
+            for i in range(100)
+        ]
+    )
+    f = io.StringIO()
+    state.dump(f)
+    assert yaml.safe_load(f.getvalue()) == yaml.safe_load(
+        yaml.safe_dump(state.representation, default_flow_style=False)
+    )
+    f.seek(0)
+    assert MirrorState.load(f) == state
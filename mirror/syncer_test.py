@@ -1,8 +1,15 @@
+import os
+import tempfile
+from unittest import mock
+
+import git
 from inline_snapshot._external._external_file import ExternalFile
 import pytest
 
+from .constants import MIRROR_FILE, MIRROR_LOCK
+from .githelper import GitHelper
 from .syncer import MirrorSyncer
-from .test_utils import setup_repo, snapshot_of_repo
+from .test_utils import add_commit, quick_installer, setup_repo, snapshot_of_repo
 from .typed_path import AbsDir, GitDir, RelDir
 
 
@@ -32,3 +39,36 @@ def test_installer_install(
     setup_repo(local_git_repo, test_data_path / RelDir(test_name))
     syncer.sync()
     assert snapshot_of_repo(local_git_repo, include_lockfile=True) == json_snapshot
+
+
+def test_sync_unchanged_skips_per_file_work(local_git_repo: GitDir) -> None:
+    remote = tempfile.mkdtemp()
+    filenames = [f"file{i}" for i in range(20)]
+    add_commit(remote, {filename: filename for filename in filenames})
+    config = "repos:\n  - source: {}\n    files:\n{}".format(
+        remote, "".join(f"      - {filename}\n" for filename in filenames)
+    )
+    add_commit(local_git_repo, {os.fspath(MIRROR_FILE): config})
+    quick_installer(local_git_repo, None).install()
+    lock_mtime = os.path.getmtime(local_git_repo / MIRROR_LOCK)
+
+    with mock.patch.object(GitHelper, "run_command", wraps=GitHelper.run_command) as run_command:
+        quick_syncer(local_git_repo).sync()
+    commands = {call.args[1] for call in run_command.call_args_list}
+    assert commands.isdisjoint({"diff", "apply", "fast-import"})
+    assert os.path.getmtime(local_git_repo / MIRROR_LOCK) == lock_mtime
+
+
+def test_sync_stages_edited_config_with_unchanged_lock(local_git_repo: GitDir) -> None:
+    remote = tempfile.mkdtemp()
+    add_commit(remote, dict(file="contents"))
+    config = f"repos:\n  - source: {remote}\n    files:\n      - file\n"
+    add_commit(local_git_repo, {os.fspath(MIRROR_FILE): config})
+    quick_installer(local_git_repo, None).install()
+    add_commit(local_git_repo, None)
+    with open(local_git_repo / MIRROR_FILE, "a") as f:
+        f.write("# edited\n")
+
+    quick_syncer(local_git_repo).sync()
+    staged = git.Repo(local_git_repo).git.diff("--cached", "--name-only").splitlines()
+    assert staged == [os.fspath(MIRROR_FILE)]
@@ -135,6 +135,19 @@ class Remote:
             return os.path.realpath(self)
         return self._without_trailing_slashes()
 
+    @property
+    def host(self) -> str | None:
+        if os.path.exists(self):
+            return None
+        if "://" in self.repo:
+            match = re.match(r"^[a-zA-Z][a-zA-Z0-9+.-]*://(?:[^@/]*@)?([^/:]+)", self.repo)
+        else:
+            # scp-like syntax (eg "git@github.com:user/repo").
+            match = re.match(r"^(?:[^@/:]*@)?([^/:]+):", self.repo)
+        if match is None:
+            return None
+        return match.group(1).lower()
+
     def _without_trailing_slashes(self) -> str:
         strip_trailing_slash_pattern = r"^(.*?)\/*$"
         match = re.match(strip_trailing_slash_pattern, self.repo)
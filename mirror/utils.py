@@ -1,7 +1,18 @@
-from collections.abc import Hashable, Iterable
+from collections import deque
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextlib
+import functools
+import itertools
+import os
+from os import PathLike
+import tempfile
+import threading
 import typing
 from typing import Any, Literal, TypeAliasType, overload
 
+TMP_PREFIX = ".tmp-"
+
 
 def all_unique[T: Hashable](items: Iterable[T]) -> bool:
     seen = set()
@@ -45,3 +56,112 @@ def strict_literal_cast[T](types: tuple, expr: T, /) -> T:
     if expr in types:
         return expr
     raise TypeError()
+
+
+def run_in_parallel[T, R](fn: Callable[[T], R], items: Iterable[T], *, jobs: int) -> list[R]:
+    """Map `fn` over `items` with up to `jobs` threads, keeping results and errors in order."""
+    if jobs <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(fn, item) for item in items]
+        try:
+            return [future.result() for future in futures]
+        except BaseException:
+            executor.shutdown(cancel_futures=True)
+            raise
+
+
+def write_atomically(file: PathLike[str], contents: bytes) -> None:
+    """Write `contents` to `file` so that readers in other processes never see it partially written."""
+    directory = os.path.dirname(file)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=TMP_PREFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(contents)
+        os.replace(tmp, file)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+
+
+def set_executable(file: PathLike[str], executable: bool) -> None:
+    """Give execute permission to whoever can read `file`, as git does, or take it away."""
+    mode = os.stat(file).st_mode
+    if executable:
+        mode |= (mode & 0o444) >> 2
+    else:
+        mode &= ~0o111
+    os.chmod(file, mode)
+
+
+def run_ahead_in_parallel[T, R](
+    fn: Callable[[T], R], items: Iterable[T], *, jobs: int, buffer: int
+) -> Iterator[list[tuple[T, R]]]:
+    """Map `fn` over `items` with up to `jobs` threads, yielding results in order while the rest are computed.
+
+    At most `buffer` results are computed ahead of the consumer, and results that are ready
+    at the same time are yielded together.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending: deque[tuple[T, Future[R]]] = deque()
+
+        def fill() -> None:
+            for item in itertools.islice(items, max(buffer - len(pending), 0)):
+                pending.append((item, executor.submit(fn, item)))
+
+        try:
+            fill()
+            while pending:
+                item, future = pending.popleft()
+                batch = [(item, future.result())]
+                # Errors are raised on their own, after the results before them.
+                while pending and pending[0][1].done() and pending[0][1].exception() is None:
+                    item, future = pending.popleft()
+                    batch.append((item, future.result()))
+                fill()
+                yield batch
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+
+class synchronized_cache[R]:  # noqa: N801
+    """`functools.cache` that computes each entry at most once, even when called from many threads."""
+
+    def __init__(self, fn: Callable[..., R]) -> None:
+        self._fn = fn
+        self._cache: dict[Hashable, R] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        functools.update_wrapper(self, fn)
+
+    @classmethod
+    def _key(cls, *args: object, **kwargs: object) -> Hashable:
+        return (args, tuple(sorted(kwargs.items())))
+
+    def __call__(self, *args: Hashable, **kwargs: Hashable) -> R:
+        key = self._key(*args, **kwargs)
+        with self._key_lock(key):
+            if key not in self._cache:
+                self._cache[key] = self._fn(*args, **kwargs)
+            return self._cache[key]
+
+    def _key_lock(self, key: Hashable) -> threading.Lock:
+        # Key locks are never removed, so callers of one key always share a lock.
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            keys = list(self._key_locks)
+        for key in keys:
+            with self._key_lock(key):
+                self._cache.pop(key, None)
+
+    def cache_discard(self, *args: object, **kwargs: object) -> R | None:
+        """Remove one entry, returning it if it was cached (once any call computing it finishes)."""
+        key = self._key(*args, **kwargs)
+        with self._key_lock(key):
+            return self._cache.pop(key, None)
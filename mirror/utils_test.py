@@ -1,9 +1,18 @@
 import random
+import threading
+import time
 from typing import Literal, Never, cast
 
 import pytest
 
-from .utils import all_unique, strict_cast, strict_not_none
+from .utils import (
+    all_unique,
+    run_ahead_in_parallel,
+    run_in_parallel,
+    strict_cast,
+    strict_not_none,
+    synchronized_cache,
+)
 
 
 @pytest.mark.parametrize("seed", range(3))
@@ -92,3 +101,110 @@ def test_strict_cast_typealias_fail() -> None:
     x: str = "4"
     with pytest.raises(TypeError):
         _: TypeAlias2 = strict_cast(TypeAlias2, x)
+
+
+@pytest.mark.parametrize("jobs", [1, 2, 8])
+def test_run_in_parallel_keeps_order(jobs: int) -> None:
+    def slow_square(x: int) -> int:
+        time.sleep(random.random() / 100)
+        return x * x
+
+    assert run_in_parallel(slow_square, range(10), jobs=jobs) == [x * x for x in range(10)]
+
+
+@pytest.mark.parametrize("jobs", [1, 2, 8])
+def test_run_in_parallel_raises_first_error(jobs: int) -> None:
+    def fail_on_odd(x: int) -> int:
+        time.sleep((10 - x) / 1000)
+        if x % 2:
+            raise ValueError(x)
+        return x
+
+    with pytest.raises(ValueError) as e:
+        run_in_parallel(fail_on_odd, range(10), jobs=jobs)
+    assert e.value.args == (1,)
+
+
+@pytest.mark.parametrize("jobs", [1, 2, 8])
+def test_run_ahead_in_parallel_keeps_order(jobs: int) -> None:
+    def slow_square(x: int) -> int:
+        time.sleep(random.random() / 100)
+        return x * x
+
+    batches = list(run_ahead_in_parallel(slow_square, range(10), jobs=jobs, buffer=4))
+    assert all(batches)
+    assert [result for batch in batches for result in batch] == [(x, x * x) for x in range(10)]
+
+
+def test_run_ahead_in_parallel_bounds_buffer() -> None:
+    started: list[int] = []
+    results = run_ahead_in_parallel(started.append, range(10), jobs=8, buffer=3)
+    batch = next(results)
+    time.sleep(0.01)
+    assert len(started) <= len(batch) + 3
+    list(results)
+    assert sorted(started) == list(range(10))
+
+
+def test_run_ahead_in_parallel_raises_first_error() -> None:
+    def fail_on_odd(x: int) -> int:
+        time.sleep((10 - x) / 1000)
+        if x % 2:
+            raise ValueError(x)
+        return x
+
+    results = run_ahead_in_parallel(fail_on_odd, range(10), jobs=4, buffer=10)
+    assert next(results)[0] == (0, 0)
+    with pytest.raises(ValueError) as e:
+        next(results)
+    assert e.value.args == (1,)
+
+
+def test_synchronized_cache_computes_once() -> None:
+    calls: list[int] = []
+
+    @synchronized_cache
+    def slow_identity(x: int) -> int:
+        calls.append(x)
+        time.sleep(0.01)
+        return x
+
+    threads = [threading.Thread(target=slow_identity, args=(i % 2,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(calls) == [0, 1]
+
+    slow_identity.cache_clear()
+    assert slow_identity(0) == 0
+    assert sorted(calls) == [0, 0, 1]
+
+    assert slow_identity.cache_discard(0) == 0
+    assert slow_identity.cache_discard(0) is None
+    assert slow_identity(0) == 0
+    assert slow_identity(1) == 1
+    assert sorted(calls) == [0, 0, 0, 1, 1]
+
+
+def test_synchronized_cache_discard_waits_for_computation() -> None:
+    calls: list[int] = []
+    started = threading.Event()
+
+    @synchronized_cache
+    def slow_identity(x: int) -> int:
+        calls.append(x)
+        started.set()
+        time.sleep(0.05)
+        return x
+
+    first = threading.Thread(target=slow_identity, args=(0,))
+    first.start()
+    started.wait()
+    assert slow_identity.cache_discard(0) == 0
+    threads = [threading.Thread(target=slow_identity, args=(0,)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in [first, *threads]:
+        thread.join()
+    assert calls == [0, 0]